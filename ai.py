@@ -0,0 +1,232 @@
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+import config
+from bitboard import PAD
+from engine import ROTATIONS, COLUMNS, Engine, NO_ACTION
+from movegen import placements, find_path
+from zobrist import TranspositionTable, get_keys, kind_key
+
+# Компьютерный игрок. Положение фигуры оценивается классическими признаками
+# поля: суммарная высота столбцов, дыры, неровность (сумма перепадов высот
+# соседних столбцов) и число убранных линий. С просмотром вперёд для каждого
+# положения текущей фигуры перебираются положения следующей (Engine.next).
+# Оценки полей запоминаются в таблице позиций по хэшу Зобриста (zobrist.py),
+# а поиск укладывается в бюджет времени. Веса, подобранные tune.py,
+# читает load_weights(); по умолчанию Planner играет с DEFAULT_WEIGHTS.
+TUNING_FILE = "assets/tuning.json"
+DEFAULT_WEIGHTS = {
+    "height": -0.510066,
+    "lines": 0.760666,
+    "holes": -0.35663,
+    "bumpiness": -0.184483,
+}
+TABLE_BITS = 18  # размер таблицы позиций: 2**18 записей
+
+# Лёгкая копия поля для перебора: movegen.placements читает rows, height,
+# walls и columns; hash - хэш Зобриста, как у BitBoard
+Board = namedtuple("Board", "rows height walls columns hash")
+
+
+def load_weights(path=TUNING_FILE):
+    # Лучшие по проверке веса из файла tune.py или None, если их ещё нет.
+    # Файлы без проверочных сидов (старый формат) не используются
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            state = json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"Ошибка загрузки {path}: {e}")
+        return None
+    if not state.get("validation_seeds") or not state.get("best"):
+        return None
+    return state["best"]["weights"]
+
+
+def place(board, masks, x, y):
+    # Поле после фиксации фигуры и убранных линий: (поле, число линий).
+    # Хэш пересчитывается только по изменившимся строкам
+    keys = get_keys(board.columns, board.height)
+    cell_mask = (1 << board.columns) - 1
+    rows = list(board.rows)
+    value = board.hash
+    shift = x + PAD
+    for i, mask in enumerate(masks):
+        old = rows[y + i]
+        rows[y + i] = old | mask << shift
+        value ^= keys.row(y + i, (old >> PAD) & cell_mask) ^ keys.row(y + i, (rows[y + i] >> PAD) & cell_mask)
+    full = (1 << (2 * PAD + board.columns)) - 1
+    kept = [row for row in rows if row != full]
+    lines = len(rows) - len(kept)
+    if lines:
+        shifted = [board.walls] * lines + kept
+        for row, (old, new) in enumerate(zip(rows, shifted)):
+            if old != new:
+                value ^= keys.row(row, (old >> PAD) & cell_mask) ^ keys.row(row, (new >> PAD) & cell_mask)
+        rows = shifted
+    return board._replace(rows=tuple(rows), hash=value), lines
+
+
+def features(rows, walls, columns):
+    # (суммарная высота, дыры, неровность) по строкам сверху вниз
+    heights = [0] * columns
+    holes = 0
+    covered = 0  # столбцы, над которыми уже есть блок
+    height = len(rows)
+    for y, row in enumerate(rows):
+        cells = (row & ~walls) >> PAD
+        holes += bin(covered & ~cells).count("1")
+        top = cells & ~covered
+        while top:
+            low = top & -top
+            heights[low.bit_length() - 1] = height - y
+            top ^= low
+        covered |= cells
+    bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+    return sum(heights), holes, bumpiness
+
+
+def spawn(kind):
+    # Начальное положение фигуры, как в engine.Tetromino
+    return COLUMNS // 2 - ROTATIONS[kind][0].width // 2, 0, 0
+
+
+class Planner:
+    def __init__(self, weights=None, lookahead=1, budget_ms=config.AI_TIME_BUDGET_MS, table=None):
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.lookahead = lookahead
+        self.budget_ms = budget_ms
+        # Таблицу можно разделить с другим кодом поиска
+        self.table = table or TranspositionTable(TABLE_BITS)
+        self.timeouts = 0
+
+    def board_score(self, board):
+        # Оценка поля без учёта линий; глубина 0 в таблице позиций
+        score = self.table.get(board.hash)
+        if score is None:
+            height, holes, bumpiness = features(board.rows, board.walls, board.columns)
+            weights = self.weights
+            score = weights["height"] * height + weights["holes"] * holes + weights["bumpiness"] * bumpiness
+            self.table.put(board.hash, score)
+        return score
+
+    def outcomes(self, board, kind, x, y, rotation):
+        # (оценка, положение, поле после него) для всех положений фигуры
+        result = []
+        for placement in placements(board, kind, x, y, rotation):
+            after, lines = place(board, placement.masks, placement.x, placement.y)
+            score = self.weights["lines"] * lines + self.board_score(after)
+            result.append((score, placement, after))
+        result.sort(key=lambda outcome: outcome[0], reverse=True)
+        return result
+
+    def best_score(self, board, kind):
+        # Лучшая оценка после хода фигуры kind; глубина 1 в таблице позиций
+        key = board.hash ^ kind_key(kind)
+        score = self.table.get(key, 1)
+        if score is None:
+            x, y, rotation = spawn(kind)
+            outcomes = self.outcomes(board, kind, x, y, rotation)
+            # Следующая фигура не помещается - партия проиграна
+            score = outcomes[0][0] if outcomes else float("-inf")
+            self.table.put(key, score, 1)
+        return score
+
+    def choose(self, engine):
+        # Лучшее положение текущей фигуры или None, если его нет
+        start = time.perf_counter()
+        self.table.new_search()
+        source = engine.board
+        board = Board(tuple(source.rows), source.height, source.walls, source.columns, source.hash)
+        piece = engine.current
+        outcomes = self.outcomes(board, piece.kind, piece.x, piece.y, piece.rotation)
+        if not outcomes:
+            return None
+        if not self.lookahead or engine.next is None:
+            return outcomes[0][1]
+
+        # Уточнение просмотром следующей фигуры: сначала лучшие по первой
+        # оценке, пока хватает бюджета; неуточнённые положения не выбираются.
+        # Лучшее по первой оценке уточняется всегда, даже если бюджет уже исчерпан
+        best = None
+        for score, placement, after in outcomes:
+            elapsed = (time.perf_counter() - start) * 1000
+            if best is not None and self.budget_ms is not None and elapsed > self.budget_ms:
+                self.timeouts += 1
+                break
+            total = score - self.board_score(after) + self.best_score(after, engine.next.kind)
+            if best is None or total > best[0]:
+                best = (total, placement)
+        return best[1]
+
+
+class AIPlayer:
+    # Ведёт Engine в реальном времени: для каждой новой фигуры выбирает
+    # положение и подаёт действия по одному раз в move_delay мс
+    def __init__(self, engine, planner=None, move_delay=config.AI_MOVE_DELAY):
+        self.engine = engine
+        # В игре - подобранные tune.py веса, если они есть
+        self.planner = planner or Planner(load_weights())
+        self.move_delay = move_delay
+        self.piece = None
+        self.target = None
+        self.wait = 0
+
+    def act(self, dt):
+        engine = self.engine
+        if engine.game_over:
+            return NO_ACTION
+        if engine.current is not self.piece:
+            self.piece = engine.current
+            self.target = self.planner.choose(engine)
+            self.wait = self.move_delay
+
+        self.wait -= dt
+        if self.wait > 0 or self.target is None:
+            return NO_ACTION
+        self.wait = self.move_delay
+
+        # Путь ищется от текущего положения: гравитация могла сдвинуть фигуру
+        path = find_path(engine, self.target)
+        if not path:
+            self.target = self.planner.choose(engine)
+            path = self.target and find_path(engine, self.target)
+            if not path:
+                return NO_ACTION
+        return path[0]
+
+
+def autoplay(seed=0, pieces=1000, planner=None):
+    # Партия без отрисовки и таймеров: каждая фигура сразу ставится в выбранное положение
+    engine = Engine(seed=seed)
+    planner = planner or Planner(budget_ms=None)
+    count = 0
+    while not engine.game_over and count < pieces:
+        target = planner.choose(engine)
+        if target is None:
+            break
+        for action in find_path(engine, target):
+            engine.apply(action)
+        count += 1
+    return {"seed": seed, "pieces": count, "score": engine.score,
+            "lines": engine.lines_cleared_total, "game_over": engine.game_over}
+
+
+if __name__ == "__main__":
+    # python ai.py [число партий] [фигур в партии] [просмотр вперёд 0/1]
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    pieces = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    lookahead = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    planner = Planner(load_weights(), lookahead, budget_ms=None)
+    start = time.perf_counter()
+    total_pieces = 0
+    for seed in range(games):
+        result = autoplay(seed, pieces, planner)
+        total_pieces += result["pieces"]
+        print(f"сид {seed}: фигур {result['pieces']}, линий {result['lines']}, очков {result['score']}"
+              f"{', проигрыш' if result['game_over'] else ''}")
+    elapsed = time.perf_counter() - start
+    print(f"{total_pieces / elapsed:,.1f} фигур/с, таблица позиций: {planner.table.stats}")
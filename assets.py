@@ -0,0 +1,124 @@
+import importlib
+import io
+import os
+import threading
+import time
+import pygame
+from fonts import FONT_NAME
+
+# Фоновая загрузка ресурсов при старте: меню появляется сразу, а к первому
+# нажатию модули уже импортированы, звуки декодированы, данные прочитаны.
+# По окончании печатается отчёт о времени каждого шага.
+MUSIC_FILE = "assets/MenuTheme.mp3"
+SOUND_FILES = {
+    "click": "assets/sounds/click.wav",
+    "error": "assets/sounds/error.wav",
+    "success": "assets/sounds/success.wav",
+}
+PRELOAD_MODULES = ("game", "rating", "toptable")
+
+
+class AssetManager:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.music = None  # содержимое файла музыки
+        self.sounds = {}
+        self.timings = []  # (шаг, секунды)
+        self.marks = []  # (событие, секунды от старта)
+        self.tasks = [
+            ("музыка", self.load_music),
+            ("звуки", self.load_sounds),
+            ("шрифты", self.load_fonts),
+            ("пользователи", self.load_users),
+            ("рекорды", self.load_highscores),
+            ("модули", self.load_modules),
+        ]
+        self.done = 0
+        self.ready = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.load_all, name="assets", daemon=True)
+            self.thread.start()
+        return self
+
+    def progress(self):
+        return self.done / len(self.tasks)
+
+    def mark(self, name):
+        # Отметка события главного потока (например, первый кадр меню) для отчёта
+        self.marks.append((name, time.perf_counter() - self.started))
+
+    def load_all(self):
+        for name, task in self.tasks:
+            start = time.perf_counter()
+            try:
+                task()
+            except Exception as e:
+                print(f"Ошибка загрузки ({name}): {e}")
+            self.timings.append((name, time.perf_counter() - start))
+            self.done += 1
+        self.ready.set()
+        self.report()
+
+    def load_music(self):
+        if os.path.exists(MUSIC_FILE):
+            with open(MUSIC_FILE, "rb") as f:
+                self.music = f.read()
+
+    def load_sounds(self):
+        if not pygame.mixer.get_init():
+            return
+        for name, path in SOUND_FILES.items():
+            if os.path.exists(path):
+                self.sounds[name] = pygame.mixer.Sound(path)
+        if len(self.sounds) < len(SOUND_FILES):
+            print("Звуковые эффекты не загружены")
+
+    def load_fonts(self):
+        # Самое медленное в SysFont - поиск системных шрифтов; он кэшируется pygame
+        pygame.font.match_font(FONT_NAME)
+        pygame.font.match_font(FONT_NAME, bold=True)
+
+    def load_users(self):
+        from userstore import get_user_directory
+        get_user_directory()
+
+    def load_highscores(self):
+        from scorestore import get_store
+        get_store().count()
+
+    def load_modules(self):
+        for name in PRELOAD_MODULES:
+            importlib.import_module(name)
+
+    def sound(self, name):
+        return self.sounds.get(name)
+
+    def play_music(self, volume=0.5):
+        # Возвращает False, если музыка ещё не прочитана или её нет
+        if self.music is None:
+            return False
+        pygame.mixer.music.load(io.BytesIO(self.music), os.path.basename(MUSIC_FILE))
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(-1)
+        return True
+
+    def report(self):
+        lines = [f"  {name:<14}{seconds * 1000:8.1f} мс" for name, seconds in self.timings]
+        lines += [f"  {name:<14}{seconds * 1000:8.1f} мс от старта" for name, seconds in self.marks]
+        total = time.perf_counter() - self.started
+        print("Загрузка ресурсов:\n" + "\n".join(lines) + f"\n  {'всего':<14}{total * 1000:8.1f} мс")
+
+
+_assets = None
+_assets_lock = threading.Lock()
+
+
+def get_assets():
+    global _assets
+    with _assets_lock:
+        if _assets is None:
+            _assets = AssetManager()
+        return _assets
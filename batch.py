@@ -0,0 +1,182 @@
+import sys
+import time
+import numpy as np
+from engine import (COLUMNS, ROWS, COLORS, PIECE_NAMES, ROTATIONS, MOVE_LEFT, MOVE_RIGHT,
+                    ROTATE, SOFT_DROP, HARD_DROP, Engine)
+from randomizer import UniformRandomizer
+
+# Смещения клеток фигур: [фигура, поворот, клетка] (у всех фигур по 4 клетки)
+CELL_X = np.array([[[x for x, y in state.cells] for state in ROTATIONS[name]]
+                   for name in PIECE_NAMES], dtype=np.int64)
+CELL_Y = np.array([[[y for x, y in state.cells] for state in ROTATIONS[name]]
+                   for name in PIECE_NAMES], dtype=np.int64)
+SPAWN_X = np.array([COLUMNS // 2 - ROTATIONS[name][0].width // 2 for name in PIECE_NAMES],
+                   dtype=np.int64)
+PIECE_INDEX = {name: i for i, name in enumerate(PIECE_NAMES)}
+ROW_INDICES = np.arange(ROWS)
+NAME_BY_COLOR = {color: name for name, color in COLORS.items()}
+
+
+class BatchEngine:
+    # N партий одновременно: поля хранятся одним массивом (N, ROWS, COLUMNS),
+    # 0 - пустая клетка, иначе номер фигуры + 1. Правила совпадают с engine.Engine.
+    def __init__(self, count, seeds=None, base_fall_speed=500, speed_increase_interval=10, randomizers=None):
+        self.count = count
+        if randomizers is None:
+            if seeds is None:
+                seeds = [None] * count
+            randomizers = [UniformRandomizer(seed) for seed in seeds]
+        self.randomizers = list(randomizers)
+        self.boards = np.zeros((count, ROWS, COLUMNS), dtype=np.uint8)
+        self.kind = np.zeros(count, dtype=np.int64)
+        self.next_kind = np.zeros(count, dtype=np.int64)
+        self.rotation = np.zeros(count, dtype=np.int64)
+        self.x = np.zeros(count, dtype=np.int64)
+        self.y = np.zeros(count, dtype=np.int64)
+        self.fall_time = np.zeros(count, dtype=np.int64)
+        self.base_fall_speed = base_fall_speed
+        self.fall_speed = np.full(count, base_fall_speed, dtype=np.int64)
+        self.speed_increase_interval = speed_increase_interval
+        self.score = np.zeros(count, dtype=np.int64)
+        self.level = np.ones(count, dtype=np.int64)
+        self.lines_cleared_total = np.zeros(count, dtype=np.int64)
+        self.game_over = np.zeros(count, dtype=bool)
+
+        # Тот же порядок выборки, что в Engine.__init__: текущая, затем следующая
+        for i in range(count):
+            self.kind[i] = PIECE_INDEX[self.randomizers[i].next()]
+            self.next_kind[i] = PIECE_INDEX[self.randomizers[i].next()]
+        self.x[:] = SPAWN_X[self.kind]
+
+    def collides(self, idx, rotation, x, y):
+        kind = self.kind[idx]
+        cx = x[:, None] + CELL_X[kind, rotation]
+        cy = y[:, None] + CELL_Y[kind, rotation]
+        outside = (cx < 0) | (cx >= COLUMNS) | (cy >= ROWS)
+        occupied = self.boards[idx[:, None], np.clip(cy, 0, ROWS - 1), np.clip(cx, 0, COLUMNS - 1)] != 0
+        return (outside | (occupied & (cy >= 0))).any(axis=1)
+
+    def move(self, idx, dx):
+        ok = ~self.collides(idx, self.rotation[idx], self.x[idx] + dx, self.y[idx])
+        self.x[idx[ok]] += dx
+
+    def rotate(self, idx):
+        rotation = (self.rotation[idx] + 1) % 4
+        ok = ~self.collides(idx, rotation, self.x[idx], self.y[idx])
+        self.rotation[idx[ok]] = rotation[ok]
+
+    def drop(self, idx):
+        falling = idx
+        while falling.size:
+            ok = ~self.collides(falling, self.rotation[falling], self.x[falling], self.y[falling] + 1)
+            falling = falling[ok]
+            self.y[falling] += 1
+        self.lock(idx)
+
+    def gravity(self, idx, dt):
+        self.fall_time[idx] += dt
+        self.soft_drop(idx[self.fall_time[idx] > self.fall_speed[idx]])
+
+    def soft_drop(self, idx):
+        if not idx.size:
+            return
+        self.fall_time[idx] = 0
+        ok = ~self.collides(idx, self.rotation[idx], self.x[idx], self.y[idx] + 1)
+        self.y[idx[ok]] += 1
+        self.lock(idx[~ok])
+
+    def lock(self, idx):
+        if not idx.size:
+            return
+        kind = self.kind[idx]
+        cx = self.x[idx, None] + CELL_X[kind, self.rotation[idx]]
+        cy = self.y[idx, None] + CELL_Y[kind, self.rotation[idx]]
+        games = np.broadcast_to(idx[:, None], cx.shape)
+        visible = cy >= 0
+        self.boards[games[visible], cy[visible], cx[visible]] = np.broadcast_to(
+            (kind + 1)[:, None], cx.shape)[visible]
+        self.clear_lines(idx)
+
+        # Следующая фигура - из генератора каждой партии
+        self.kind[idx] = self.next_kind[idx]
+        self.rotation[idx] = 0
+        self.x[idx] = SPAWN_X[self.kind[idx]]
+        self.y[idx] = 0
+        for i in idx.tolist():
+            self.next_kind[i] = PIECE_INDEX[self.randomizers[i].next()]
+        blocked = self.collides(idx, self.rotation[idx], self.x[idx], self.y[idx])
+        self.game_over[idx[blocked]] = True
+
+    def clear_lines(self, idx):
+        boards = self.boards[idx]
+        full = (boards != 0).all(axis=2)
+        cleared = full.sum(axis=1)
+        if not cleared.any():
+            return
+        # Стабильная сортировка поднимает полные строки наверх, сохраняя порядок остальных
+        order = np.argsort(~full, axis=1, kind="stable")
+        boards = np.take_along_axis(boards, order[:, :, None], axis=1)
+        boards[ROW_INDICES[None, :] < cleared[:, None]] = 0
+        self.boards[idx] = boards
+
+        self.lines_cleared_total[idx] += cleared
+        new_level = self.lines_cleared_total[idx] // self.speed_increase_interval + 1
+        up = new_level > self.level[idx]
+        self.level[idx[up]] = new_level[up]
+        self.fall_speed[idx[up]] = np.maximum(100, self.base_fall_speed - (new_level[up] - 1) * 50)
+        self.score[idx] += cleared * 100
+
+    def step(self, actions, dt):
+        # Аналог Engine.apply(actions[i]) и Engine.update(dt) для каждой живой партии
+        actions = np.asarray(actions)
+        alive = ~self.game_over
+        self.move(np.flatnonzero(alive & (actions == MOVE_LEFT)), -1)
+        self.move(np.flatnonzero(alive & (actions == MOVE_RIGHT)), 1)
+        self.rotate(np.flatnonzero(alive & (actions == ROTATE)))
+        self.soft_drop(np.flatnonzero(alive & (actions == SOFT_DROP)))
+        self.drop(np.flatnonzero(alive & (actions == HARD_DROP) & ~self.game_over))
+        self.gravity(np.flatnonzero(~self.game_over), dt)
+
+    def board_colors(self, i):
+        return [[0 if cell == 0 else PIECE_NAMES[cell - 1] for cell in row] for row in self.boards[i].tolist()]
+
+
+def compare_with_engine(count=64, steps=2000, seed=0):
+    # Пошаговая сверка с engine.Engine на одинаковых сидах и действиях
+    actions_rng = np.random.default_rng(seed)
+    batch = BatchEngine(count, seeds=range(count))
+    games = [Engine(seed=i) for i in range(count)]
+    for _ in range(steps):
+        actions = actions_rng.integers(0, HARD_DROP + 1, count)
+        batch.step(actions, 17)
+        for game, action in zip(games, actions.tolist()):
+            if not game.game_over:
+                game.apply(action)
+            if not game.game_over:
+                game.update(17)
+    for i, game in enumerate(games):
+        expected = [[0 if cell == 0 else NAME_BY_COLOR[cell] for cell in row] for row in game.board.colors]
+        state = (game.score, game.level, game.lines_cleared_total, game.game_over,
+                 game.current.x, game.current.y, game.current.rotation)
+        batch_state = (batch.score[i], batch.level[i], batch.lines_cleared_total[i], batch.game_over[i],
+                       batch.x[i], batch.y[i], batch.rotation[i])
+        if state != tuple(v.item() for v in batch_state) or expected != batch.board_colors(i):
+            return False
+    return True
+
+
+def benchmark(count=4096, steps=1000):
+    actions_rng = np.random.default_rng(0)
+    batch = BatchEngine(count, seeds=range(count))
+    start = time.perf_counter()
+    for _ in range(steps):
+        batch.step(actions_rng.integers(0, HARD_DROP + 1, count), 17)
+    elapsed = time.perf_counter() - start
+    print(f"{count * steps / elapsed:,.0f} шагов/с ({count} партий x {steps} шагов за {elapsed:.2f} с)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "check":
+        print("OK" if compare_with_engine() else "РАСХОЖДЕНИЕ")
+    else:
+        benchmark()
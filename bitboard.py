@@ -0,0 +1,79 @@
+from zobrist import get_keys
+
+# Поле в виде битовых масок: каждая строка - одно целое число,
+# бит (PAD + x) соответствует столбцу x. Слева и справа строки
+# окружены "стенами" из единиц, поэтому выход за границы поля
+# ловится той же операцией AND, что и столкновение с блоками.
+PAD = 4  # ширина стены: ни одна фигура не шире 4 клеток
+
+
+def shape_masks(shape):
+    return tuple(sum(1 << x for x, cell in enumerate(row) if cell) for row in shape)
+
+
+class BitBoard:
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.height = rows
+        wall = (1 << PAD) - 1
+        self.walls = wall | (wall << (PAD + columns))
+        self.full_row = (1 << (2 * PAD + columns)) - 1
+        self.rows = [self.walls] * rows
+        # Цвета нужны только для отрисовки
+        self.colors = [[0] * columns for _ in range(rows)]
+        # Растёт при каждом изменении поля - по нему рендер понимает, что кэш устарел
+        self.version = 0
+        # Хэш Зобриста занятых клеток (zobrist.py); пустое поле - 0.
+        # Обновляется только по изменившимся строкам
+        self.keys = get_keys(columns, rows)
+        self.cell_mask = (1 << columns) - 1
+        self.hash = 0
+
+    def row_hash(self, y, row):
+        return self.keys.row(y, (row >> PAD) & self.cell_mask)
+
+    def collides(self, masks, x, y):
+        shift = x + PAD
+        if shift < 0 or shift >= PAD + self.columns:
+            return True
+        rows = self.rows
+        for i, mask in enumerate(masks):
+            row = y + i
+            if row >= self.height:
+                return True
+            if (rows[row] if row >= 0 else self.walls) & (mask << shift):
+                return True
+        return False
+
+    def place(self, masks, x, y, color):
+        shift = x + PAD
+        self.version += 1
+        for i, mask in enumerate(masks):
+            row = y + i
+            if row < 0:
+                continue
+            old = self.rows[row]
+            self.rows[row] = old | mask << shift
+            self.hash ^= self.row_hash(row, old) ^ self.row_hash(row, self.rows[row])
+            color_row = self.colors[row]
+            bit = 0
+            while mask:
+                if mask & 1:
+                    color_row[x + bit] = color
+                mask >>= 1
+                bit += 1
+
+    def clear_full_rows(self):
+        full = self.full_row
+        if full not in self.rows:
+            return 0
+        keep = [i for i, row in enumerate(self.rows) if row != full]
+        cleared = self.height - len(keep)
+        self.version += 1
+        rows = [self.walls] * cleared + [self.rows[i] for i in keep]
+        for y, (old, new) in enumerate(zip(self.rows, rows)):
+            if old != new:
+                self.hash ^= self.row_hash(y, old) ^ self.row_hash(y, new)
+        self.rows = rows
+        self.colors = [[0] * self.columns for _ in range(cleared)] + [self.colors[i] for i in keep]
+        return cleared
@@ -0,0 +1,24 @@
+# Генератор фигур: "uniform", "bag" или "history" (см. randomizer.py)
+RANDOMIZER = "uniform"
+RATING_RANDOMIZER = "bag"
+
+# Частота шагов логики (в секунду) и частота отрисовки кадров
+TICK_RATE = 100
+RENDER_FPS = 60
+# Дольше этого кадр не учитывается: после зависания игра не "догоняет" секунды
+MAX_FRAME_TIME = 250
+
+# Сколько лучших результатов возвращает load_highscores(); таблица рекордов
+# показывает все записи, читая их страницами
+HIGHSCORE_TABLE_LIMIT = 10000
+
+# Число итераций PBKDF2 для паролей; записи с меньшим числом перехэшируются при входе
+PASSWORD_ITERATIONS = 240000
+
+# Компьютерный игрок: бюджет на выбор хода (мс) и пауза между его действиями (мс)
+AI_TIME_BUDGET_MS = 4
+AI_MOVE_DELAY = 60
+
+# Игра по сети (netplay.py): порт ретранслятора и задержка ввода в шагах логики
+NET_PORT = 7777
+NET_INPUT_DELAY = 6
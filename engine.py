@@ -0,0 +1,195 @@
+from collections import namedtuple
+from bitboard import BitBoard, shape_masks
+from zobrist import piece_key
+
+# Фигуры
+TETROMINOES = {
+    'I': [[1, 1, 1, 1]],
+    'J': [[1, 0, 0],
+          [1, 1, 1]],
+    'L': [[0, 0, 1],
+          [1, 1, 1]],
+    'O': [[1, 1],
+          [1, 1]],
+    'S': [[0, 1, 1],
+          [1, 1, 0]],
+    'T': [[0, 1, 0],
+          [1, 1, 1]],
+    'Z': [[1, 1, 0],
+          [0, 1, 1]],
+}
+
+COLORS = {
+    'I': (0, 255, 255),
+    'J': (0, 0, 255),
+    'L': (255, 165, 0),
+    'O': (255, 255, 0),
+    'S': (0, 255, 0),
+    'T': (160, 32, 240),
+    'Z': (255, 0, 0),
+}
+
+PIECE_NAMES = tuple(TETROMINOES)
+
+# Постоянные размеры
+COLUMNS = 10
+ROWS = 20
+
+# Настройки режимов игры
+MODES = {
+    "normal": {"base_fall_speed": 500, "speed_increase_interval": 10},
+    "rating": {"base_fall_speed": 800, "speed_increase_interval": 5},
+}
+
+# Действия игрока (общие для пакетного движка, повторов и ботов)
+NO_ACTION = 0
+MOVE_LEFT = 1
+MOVE_RIGHT = 2
+ROTATE = 3
+SOFT_DROP = 4
+HARD_DROP = 5
+
+
+# Состояние поворота: форма, клетки (x, y), маски строк и габариты
+Rotation = namedtuple("Rotation", "shape cells masks width height")
+
+
+def build_rotations(shape):
+    states = []
+    for _ in range(4):
+        cells = tuple((x, y) for y, row in enumerate(shape) for x, cell in enumerate(row) if cell)
+        states.append(Rotation(tuple(tuple(row) for row in shape), cells,
+                               shape_masks(shape), len(shape[0]), len(shape)))
+        shape = [list(row) for row in zip(*shape[::-1])]
+    return tuple(states)
+
+
+# Все 4 поворота каждой фигуры считаются один раз при импорте
+ROTATIONS = {name: build_rotations(shape) for name, shape in TETROMINOES.items()}
+
+
+class Tetromino:
+    def __init__(self, shape):
+        self.kind = shape
+        self.rotations = ROTATIONS[shape]
+        self.rotation = 0
+        self.color = COLORS[shape]
+        self.x = COLUMNS // 2 - self.rotations[0].width // 2
+        self.y = 0
+
+    @property
+    def state(self):
+        return self.rotations[self.rotation]
+
+    @property
+    def shape(self):
+        return self.rotations[self.rotation].shape
+
+    @property
+    def cells(self):
+        return self.rotations[self.rotation].cells
+
+    @property
+    def masks(self):
+        return self.rotations[self.rotation].masks
+
+    def rotate(self, direction=1):
+        self.rotation = (self.rotation + direction) % 4
+
+
+class Engine:
+    # Правила игры без отрисовки: не требует pygame и дисплея
+    def __init__(self, seed=None, randomizer=None, mode="normal"):
+        if randomizer is None:
+            from randomizer import UniformRandomizer
+            randomizer = UniformRandomizer(seed)
+        self.randomizer = randomizer
+        self.board = BitBoard(COLUMNS, ROWS)
+        self.score = 0
+        self.current = self.new_tetromino()
+        self.next = self.new_tetromino()
+        self.fall_time = 0
+        self.game_over = False
+        self.mode = mode
+        self.base_fall_speed = MODES[mode]["base_fall_speed"]
+        self.fall_speed = self.base_fall_speed
+        self.level = 1
+        self.lines_cleared_total = 0
+        self.speed_increase_interval = MODES[mode]["speed_increase_interval"]
+
+    def new_tetromino(self):
+        return Tetromino(self.randomizer.next())
+
+    def restart(self, randomizer=None):
+        # Без нового генератора продолжаем текущую последовательность фигур
+        Engine.__init__(self, randomizer=randomizer or self.randomizer, mode=self.mode)
+
+    def position_hash(self):
+        # Хэш Зобриста поля вместе с активной фигурой
+        piece = self.current
+        return self.board.hash ^ piece_key(piece.kind, piece.rotation, piece.x, piece.y)
+
+    def valid_position(self, masks, offset_x, offset_y):
+        return not self.board.collides(masks, offset_x, offset_y)
+
+    def lock(self):
+        self.board.place(self.current.masks, self.current.x, self.current.y, self.current.color)
+        self.clear_lines()
+        self.current = self.next
+        self.next = self.new_tetromino()
+        if not self.valid_position(self.current.masks, self.current.x, self.current.y):
+            self.game_over = True
+
+    def clear_lines(self):
+        lines_cleared = self.board.clear_full_rows()
+        self.lines_cleared_total += lines_cleared
+
+        new_level = self.lines_cleared_total // self.speed_increase_interval + 1
+        if new_level > self.level:
+            self.level = new_level
+            self.fall_speed = max(100, self.base_fall_speed - (self.level - 1) * 50)
+
+        self.score += lines_cleared * 100
+
+    def move(self, dx):
+        if self.valid_position(self.current.masks, self.current.x + dx, self.current.y):
+            self.current.x += dx
+
+    def rotate(self):
+        self.current.rotate()
+        if not self.valid_position(self.current.masks, self.current.x, self.current.y):
+            self.current.rotate(-1)
+
+    def soft_drop(self):
+        # Ускоренное падение на одну строку; таймер гравитации начинается заново
+        self.fall_time = 0
+        if self.valid_position(self.current.masks, self.current.x, self.current.y + 1):
+            self.current.y += 1
+        else:
+            self.lock()
+
+    def drop(self):
+        while self.valid_position(self.current.masks, self.current.x, self.current.y + 1):
+            self.current.y += 1
+        self.lock()
+
+    def update(self, dt):
+        self.fall_time += dt
+        if self.fall_time > self.fall_speed:
+            self.fall_time = 0
+            if self.valid_position(self.current.masks, self.current.x, self.current.y + 1):
+                self.current.y += 1
+            else:
+                self.lock()
+
+    def apply(self, action):
+        if action == MOVE_LEFT:
+            self.move(-1)
+        elif action == MOVE_RIGHT:
+            self.move(1)
+        elif action == ROTATE:
+            self.rotate()
+        elif action == SOFT_DROP:
+            self.soft_drop()
+        elif action == HARD_DROP:
+            self.drop()
@@ -0,0 +1,58 @@
+import pygame
+from collections import OrderedDict
+
+# Общий реестр шрифтов и кэш отрисованного текста для всех экранов.
+# SysFont при каждом вызове ищет системные шрифты, поэтому шрифт
+# создаётся один раз, а готовые поверхности текста переиспользуются.
+FONT_NAME = "Arial"
+CACHE_LIMIT = 16 * 1024 * 1024  # байт на все закэшированные поверхности
+
+_fonts = {}
+_surfaces = OrderedDict()
+_cache_bytes = 0
+stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def get_font(size, bold=False, name=FONT_NAME):
+    key = (name, int(size), bold)
+    font = _fonts.get(key)
+    if font is None:
+        font = pygame.font.SysFont(name, int(size), bold=bold)
+        _fonts[key] = font
+    return font
+
+
+def render_text(text, size, color, bold=False, alpha=None, name=FONT_NAME):
+    # Поверхность общая для всех вызывающих - её нельзя изменять после получения.
+    # Прозрачность квантуется, чтобы анимации не забивали кэш почти одинаковыми копиями.
+    global _cache_bytes
+    if alpha is not None:
+        alpha = min(255, (max(0, int(alpha)) + 15) // 16 * 16)
+    key = (text, int(size), tuple(color), bold, alpha, name)
+    surface = _surfaces.get(key)
+    if surface is not None:
+        _surfaces.move_to_end(key)
+        stats["hits"] += 1
+        return surface
+
+    stats["misses"] += 1
+    surface = get_font(size, bold, name).render(text, True, color)
+    if alpha is not None:
+        surface.set_alpha(alpha)
+    _surfaces[key] = surface
+    _cache_bytes += surface_bytes(surface)
+    while _cache_bytes > CACHE_LIMIT and len(_surfaces) > 1:
+        _, old = _surfaces.popitem(last=False)
+        _cache_bytes -= surface_bytes(old)
+        stats["evictions"] += 1
+    return surface
+
+
+def surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+def clear_cache():
+    global _cache_bytes
+    _surfaces.clear()
+    _cache_bytes = 0
@@ -1,11 +1,17 @@
 import pygame
 import random
-import json
-import os
-import hashlib
+import config
+import passwords
 from toptable import load_highscores, show_highscores
-
-pygame.init()
+from scorestore import get_store
+from userstore import get_user_directory
+from fonts import get_font, render_text
+from notifications import Notifications
+from ai import AIPlayer
+from randomizer import PieceQueue, make_randomizer
+from replay import Replay, RESTART
+from engine import (COLUMNS, ROWS, Engine,
+                    MOVE_LEFT, MOVE_RIGHT, ROTATE, SOFT_DROP, HARD_DROP)
 
 # Цвета
 BLACK = (0, 0, 0)
@@ -15,67 +21,46 @@ RED = (220, 20, 60)
 PANEL_BG = (20, 20, 20)
 
 # Константы для рейтинга
-USER_DB_FILE = "assets/users.json"
-HIGHSCORES_FILE = "assets/highscores.json"
 FONT_NAME = "Arial"
 
-# Фигуры
-TETROMINOES = {
-    'I': [[1, 1, 1, 1]],
-    'J': [[1, 0, 0],
-          [1, 1, 1]],
-    'L': [[0, 0, 1],
-          [1, 1, 1]],
-    'O': [[1, 1],
-          [1, 1]],
-    'S': [[0, 1, 1],
-          [1, 1, 0]],
-    'T': [[0, 1, 0],
-          [1, 1, 1]],
-    'Z': [[1, 1, 0],
-          [0, 1, 1]],
-}
-
-COLORS = {
-    'I': (0, 255, 255),
-    'J': (0, 0, 255),
-    'L': (255, 165, 0),
-    'O': (255, 255, 0),
-    'S': (0, 255, 0),
-    'T': (160, 32, 240),
-    'Z': (255, 0, 0),
-}
-
 # Постоянные размеры
-COLUMNS = 10
-ROWS = 20
 PANEL_WIDTH_RATIO = 0.25
 
+# Управление игроков
+PLAYER1_KEYS = {
+    pygame.K_a: MOVE_LEFT,
+    pygame.K_d: MOVE_RIGHT,
+    pygame.K_s: SOFT_DROP,
+    pygame.K_w: ROTATE,
+    pygame.K_LSHIFT: HARD_DROP,
+}
+PLAYER2_KEYS = {
+    pygame.K_LEFT: MOVE_LEFT,
+    pygame.K_RIGHT: MOVE_RIGHT,
+    pygame.K_DOWN: SOFT_DROP,
+    pygame.K_UP: ROTATE,
+    pygame.K_SPACE: HARD_DROP,
+}
+
 class AuthSystem:
     @staticmethod
     def load_users():
-        if not os.path.exists(USER_DB_FILE):
-            print(f"Файл {USER_DB_FILE} не существует")
-            return {}
-        try:
-            with open(USER_DB_FILE, "r") as f:
-                data = json.load(f)
-                print(f"Загружено {len(data)} пользователей из {USER_DB_FILE}")
-                return data
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Ошибка загрузки {USER_DB_FILE}: {e}")
-            return {}
+        # Каталог читается с диска один раз за процесс; здесь - копия для старого API
+        users = dict(get_user_directory().users)
+        print(f"Загружено {len(users)} пользователей")
+        return users
 
     @staticmethod
     def save_users(users):
-        os.makedirs(os.path.dirname(USER_DB_FILE), exist_ok=True)
-        with open(USER_DB_FILE, "w") as f:
-            json.dump(users, f, indent=2)
-        print(f"Сохранено {len(users)} пользователей в {USER_DB_FILE}")
+        # В журнал попадают только изменившиеся записи
+        directory = get_user_directory()
+        for nickname, record in users.items():
+            if directory.get(nickname) != record:
+                directory.set(nickname, record)
 
     @staticmethod
     def hash_password(password):
-        return hashlib.sha256(password.encode()).hexdigest()
+        return passwords.hash_password(password)
 
 class RatingSystem:
     @staticmethod
@@ -83,30 +68,18 @@ class RatingSystem:
         return load_highscores()
 
     @staticmethod
-    def save_highscore(nickname, score, level, lines):
-        highscores = RatingSystem.load_highscores()
-        new_entry = {
-            "nickname": nickname,
-            "score": score,
-            "level": level,
-            "lines": lines,
-            "date": pygame.time.get_ticks()
-        }
-        print(f"Сохраняем результат: {new_entry}")
-        highscores.append(new_entry)
-        highscores.sort(key=lambda x: x["score"], reverse=True)
-        highscores = highscores[:100]
-        os.makedirs(os.path.dirname(HIGHSCORES_FILE), exist_ok=True)
-        with open(HIGHSCORES_FILE, "w") as f:
-            json.dump(highscores, f, indent=2)
-        print(f"Сохранено {len(highscores)} записей в {HIGHSCORES_FILE}")
+    def save_highscore(nickname, score, level, lines, replay=None):
+        # Одна вставка в индексированное хранилище вместо перезаписи всего файла
+        get_store().add(nickname, score, level, lines, replay=replay)
+        print(f"Сохранён результат {nickname}: {score}")
 
 class LoginScreen:
     def __init__(self, screen):
         self.screen = screen
-        self.font_large = pygame.font.SysFont(FONT_NAME, 40)
-        self.font_small = pygame.font.SysFont(FONT_NAME, 24)
+        self.font_large = get_font(40, name=FONT_NAME)
+        self.font_small = get_font(24, name=FONT_NAME)
         self.clock = pygame.time.Clock()
+        self.notifications = Notifications()
         self.screen_width, self.screen_height = screen.get_size()
         print(f"Инициализация экрана: {self.screen_width}x{self.screen_height}")
 
@@ -115,10 +88,8 @@ class LoginScreen:
         self.screen.blit(surface, (x, y))
 
     def show_message(self, text, color=pygame.Color("red")):
-        self.screen.fill(pygame.Color("dimgray"))
-        self.draw_text(text, self.font_small, color, 50, self.screen_height - 50)
-        pygame.display.flip()
-        pygame.time.delay(2000)
+        # Сообщение рисуется в цикле ввода и не останавливает обработку событий
+        self.notifications.push(text, color)
 
     def draw_input_box(self, rect, text, is_active, is_password=False):
         border_color = pygame.Color("white") if is_active else pygame.Color("gray")
@@ -203,110 +174,35 @@ class LoginScreen:
 
             if error_message:
                 self.draw_text(error_message, self.font_small, pygame.Color("red"), 50, self.screen_height - 50)
+            self.notifications.draw(self.screen)
 
             pygame.display.flip()
-            self.clock.tick(30)
-
-class Tetromino:
-    def __init__(self, shape):
-        self.shape = TETROMINOES[shape]
-        self.color = COLORS[shape]
-        self.x = COLUMNS // 2 - len(self.shape[0]) // 2
-        self.y = 0
+            self.notifications.update(self.clock.tick(30))
 
-    def rotate(self):
-        self.shape = [list(row) for row in zip(*self.shape[::-1])]
-
-class Game:
-    def __init__(self, screen):
+class Game(Engine):
+    # Отрисовка поверх движка правил из engine.py
+    def __init__(self, screen, seed=None, randomizer=None, mode="normal"):
+        super().__init__(seed, randomizer, mode)
         self.screen = screen
-        self.board = [[0 for _ in range(COLUMNS)] for _ in range(ROWS)]
-        self.score = 0
-        self.current = self.new_tetromino()
-        self.next = self.new_tetromino()
-        self.fall_time = 0
-        self.fall_speed = 500
-        self.game_over = False
         self.over_alpha = 0
         self.over_font_size = 40
         self.over_anim_time = 0
-        self.font = pygame.font.SysFont('Arial', 24)
-        self.base_fall_speed = 500
-        self.fall_speed = self.base_fall_speed
-        self.level = 1
-        self.lines_cleared_total = 0
-        self.speed_increase_interval = 10
-
-    def new_tetromino(self):
-        return Tetromino(random.choice(list(TETROMINOES.keys())))
-
-    def restart(self):
-        self.__init__(self.screen)
-
-    def valid_position(self, shape, offset_x, offset_y):
-        for y, row in enumerate(shape):
-            for x, cell in enumerate(row):
-                if cell:
-                    new_x = offset_x + x
-                    new_y = offset_y + y
-                    if new_x < 0 or new_x >= COLUMNS or new_y >= ROWS:
-                        return False
-                    if new_y >= 0 and self.board[new_y][new_x]:
-                        return False
-        return True
-
-    def lock(self):
-        for y, row in enumerate(self.current.shape):
-            for x, cell in enumerate(row):
-                if cell:
-                    px = self.current.x + x
-                    py = self.current.y + y
-                    if py >= 0:
-                        self.board[py][px] = self.current.color
-        self.clear_lines()
-        self.current = self.next
-        self.next = self.new_tetromino()
-        if not self.valid_position(self.current.shape, self.current.x, self.current.y):
-            self.game_over = True
-
-    def clear_lines(self):
-        new_board = [row for row in self.board if any(cell == 0 for cell in row)]
-        lines_cleared = ROWS - len(new_board)
-        self.lines_cleared_total += lines_cleared
-
-        new_level = self.lines_cleared_total // self.speed_increase_interval + 1
-        if new_level > self.level:
-            self.level = new_level
-            self.fall_speed = max(100, self.base_fall_speed - (self.level - 1) * 50)
-
-        for _ in range(lines_cleared):
-            new_board.insert(0, [0 for _ in range(COLUMNS)])
-        self.board = new_board
-        self.score += lines_cleared * 100
-
-    def move(self, dx):
-        if self.valid_position(self.current.shape, self.current.x + dx, self.current.y):
-            self.current.x += dx
-
-    def rotate(self):
-        old_shape = self.current.shape
-        self.current.rotate()
-        if not self.valid_position(self.current.shape, self.current.x, self.current.y):
-            self.current.shape = old_shape
-
-    def drop(self):
-        while self.valid_position(self.current.shape, self.current.x, self.current.y + 1):
-            self.current.y += 1
-        self.lock()
-
-    def update(self, dt):
-        self.fall_time += dt
-        if self.fall_time > self.fall_speed:
-            self.fall_time = 0
-            if self.valid_position(self.current.shape, self.current.x, self.current.y + 1):
-                self.current.y += 1
-            else:
-                self.lock()
+        self.font = get_font(24)
+        # Кэш слоёв отрисовки и области, нарисованные в прошлом кадре
+        self._layout = None
+        self._static_layer = None
+        self._locked_layer = None
+        self._board_version = None
+        self._full_redraw = True
+        self._piece_key = self._score_key = self._next_key = None
+        self._piece_rect = self._score_rect = self._next_rect = None
+        # Строка состояния на боковой панели (например, задержка сети)
+        self.status = ""
+        self._status_key = None
+        self._status_rect = None
+
+    def restart(self, randomizer=None):
+        self.__init__(self.screen, randomizer=randomizer or self.randomizer, mode=self.mode)
 
     def draw_game_over(self, dt, width, height):
         self.over_anim_time += dt
@@ -315,107 +211,177 @@ class Game:
         if self.over_font_size < 80:
             self.over_font_size += dt * 0.05
 
-        font = pygame.font.SysFont("Arial", int(self.over_font_size))
-        text = font.render("GAME OVER", True, RED)
-        text.set_alpha(min(255, int(self.over_alpha)))
+        text = render_text("GAME OVER", self.over_font_size, RED, alpha=self.over_alpha)
         rect = text.get_rect(center=(width // 2, height // 2 - 30))
         self.screen.blit(text, rect)
         
-        small_font = pygame.font.SysFont("Arial", 24)
-        hint_text = small_font.render("Press R to Restart", True, WHITE)
-        hint_text.set_alpha(min(255, int(self.over_alpha)))  # Fixed: _forest -> self.over_alpha
+        hint_text = render_text("Press R to Restart", 24, WHITE, alpha=self.over_alpha)
 
         hint_rect = hint_text.get_rect(center=(width // 2, height // 2 + 30))
         self.screen.blit(hint_text, hint_rect)
 
-    def draw_board(self, width, height, player_num=None):
-        cell_size = min(width * (1 - PANEL_WIDTH_RATIO) // COLUMNS, height // ROWS)
-        panel_width = int(width * PANEL_WIDTH_RATIO)
-        offset_x = 0
-        offset_y = 0
-
-        for y in range(ROWS):
-            for x in range(COLUMNS):
-                val = self.board[y][x]
-                if val:
-                    pygame.draw.rect(self.screen, val,
-                                     (offset_x + x * cell_size, offset_y + y * cell_size, cell_size, cell_size))
-                    pygame.draw.rect(self.screen, BLACK,
-                                     (offset_x + x * cell_size, offset_y + y * cell_size, cell_size, cell_size), 2)
-
-        for y, row in enumerate(self.current.shape):
-            for x, cell in enumerate(row):
-                if cell:
-                    px = offset_x + (self.current.x + x) * cell_size
-                    py = offset_y + (self.current.y + y) * cell_size
-                    pygame.draw.rect(self.screen, self.current.color, (px, py, cell_size, cell_size))
-                    pygame.draw.rect(self.screen, BLACK, (px, py, cell_size, cell_size), 2)
+    def invalidate(self):
+        # Следующий кадр будет перерисован целиком из кэшированных слоёв
+        self._full_redraw = True
 
+    def build_static_layer(self, width, height, cell_size, panel_width, player_num):
+        # Неизменная часть кадра: фон, сетка, рамки панели и подсказки управления
+        layer = pygame.Surface((width, height))
+        layer.fill(BLACK)
         for x in range(COLUMNS):
             for y in range(ROWS):
-                pygame.draw.rect(self.screen, GRAY,
-                                 (offset_x + x * cell_size, offset_y + y * cell_size, cell_size, cell_size), 1)
+                pygame.draw.rect(layer, GRAY, (x * cell_size, y * cell_size, cell_size, cell_size), 1)
 
-        panel_x = offset_x + COLUMNS * cell_size
-        pygame.draw.rect(self.screen, PANEL_BG, (panel_x, 0, panel_width, height))
-
-        score_text = self.font.render(f"Score: {self.score}", True, WHITE)
-        self.screen.blit(score_text, (panel_x + 20, 20))
+        panel_x = COLUMNS * cell_size
+        pygame.draw.rect(layer, PANEL_BG, (panel_x, 0, panel_width, height))
 
         next_panel_height = 150
-        pygame.draw.rect(self.screen, WHITE, (panel_x + 10, 60, panel_width - 20, next_panel_height), 2)
-        next_label = self.font.render("Next:", True, WHITE)
-        self.screen.blit(next_label, (panel_x + 20, 65))
-        
-        next_shape_width = len(self.next.shape[0]) * cell_size
-        next_shape_height = len(self.next.shape) * cell_size
-        start_x = panel_x + (panel_width - next_shape_width) // 2
-        start_y = 100 + (next_panel_height - next_shape_height - 40) // 2
-        
-        for y, row in enumerate(self.next.shape):
-            for x, cell in enumerate(row):
-                if cell:
-                    px = start_x + x * cell_size
-                    py = start_y + y * cell_size
-                    pygame.draw.rect(self.screen, self.next.color, (px, py, cell_size, cell_size))
-                    pygame.draw.rect(self.screen, BLACK, (px, py, cell_size, cell_size), 2)
+        pygame.draw.rect(layer, WHITE, (panel_x + 10, 60, panel_width - 20, next_panel_height), 2)
+        layer.blit(self.font.render("Next:", True, WHITE), (panel_x + 20, 65))
 
         controls_y = 60 + next_panel_height + 20
         controls_height = 100
-        pygame.draw.rect(self.screen, WHITE, (panel_x + 10, controls_y, panel_width - 20, controls_height), 2)
-
-        control_title = self.font.render("Controls:", True, WHITE)
-        self.screen.blit(control_title, (panel_x + 20, controls_y + 5))
+        pygame.draw.rect(layer, WHITE, (panel_x + 10, controls_y, panel_width - 20, controls_height), 2)
+        layer.blit(self.font.render("Controls:", True, WHITE), (panel_x + 20, controls_y + 5))
 
-        if player_num == 1:
-            control_line1 = self.font.render("Move: A / D", True, RED)
-            control_line2 = self.font.render("Rotate: W   Drop: Shift", True, RED)
-        elif player_num == 2:
+        if player_num == 2:
             control_line1 = self.font.render("Move: ← / →", True, RED)
             control_line2 = self.font.render("Rotate: ↑   Drop: Space", True, RED)
         else:
             control_line1 = self.font.render("Move: A / D", True, RED)
             control_line2 = self.font.render("Rotate: W   Drop: Shift", True, RED)
+        layer.blit(control_line1, (panel_x + 20, controls_y + 35))
+        layer.blit(control_line2, (panel_x + 20, controls_y + 65))
+        return layer
+
+    def build_locked_layer(self, cell_size):
+        # Зафиксированные блоки; перестраивается только после lock()/clear_lines()
+        layer = self._static_layer.subsurface((0, 0, COLUMNS * cell_size, ROWS * cell_size)).copy()
+        for y, row in enumerate(self.board.colors):
+            for x, val in enumerate(row):
+                if val:
+                    self.draw_cell(layer, val, x * cell_size, y * cell_size, cell_size)
+        return layer
 
-        self.screen.blit(control_line1, (panel_x + 20, controls_y + 35))
-        self.screen.blit(control_line2, (panel_x + 20, controls_y + 65))
+    @staticmethod
+    def draw_cell(surface, color, px, py, cell_size, grid=True):
+        pygame.draw.rect(surface, color, (px, py, cell_size, cell_size))
+        pygame.draw.rect(surface, BLACK, (px, py, cell_size, cell_size), 2)
+        if grid:
+            pygame.draw.rect(surface, GRAY, (px, py, cell_size, cell_size), 1)
+
+    def draw_board(self, width, height, player_num=None):
+        # Возвращает список изменившихся прямоугольников для pygame.display.update
+        cell_size = int(min(width * (1 - PANEL_WIDTH_RATIO) // COLUMNS, height // ROWS))
+        panel_width = int(width * PANEL_WIDTH_RATIO)
+        panel_x = COLUMNS * cell_size
+        board_rect = pygame.Rect(0, 0, COLUMNS * cell_size, ROWS * cell_size)
+        dirty = []
+
+        layout = (width, height, player_num, self.screen)
+        if self._layout != layout:
+            self._static_layer = self.build_static_layer(width, height, cell_size, panel_width, player_num)
+            self._layout = layout
+            self._board_version = None
+            self._full_redraw = True
+
+        if self._board_version != self.board.version:
+            self._locked_layer = self.build_locked_layer(cell_size)
+            self._board_version = self.board.version
+            self.screen.blit(self._locked_layer, board_rect)
+            dirty.append(board_rect)
+            self._piece_rect = self._piece_key = None
+
+        if self._full_redraw:
+            self.screen.blit(self._static_layer, (0, 0))
+            self.screen.blit(self._locked_layer, board_rect)
+            self._piece_rect = self._score_rect = self._next_rect = self._status_rect = None
+            self._piece_key = self._score_key = self._next_key = self._status_key = None
+            self._full_redraw = False
+            dirty = [pygame.Rect(0, 0, width, height)]
+
+        # Активная фигура: стираем старое положение слоем блоков и рисуем новое
+        piece = self.current
+        piece_key = (piece.kind, piece.rotation, piece.x, piece.y)
+        if piece_key != self._piece_key:
+            if self._piece_rect:
+                self.screen.blit(self._locked_layer, self._piece_rect, self._piece_rect)
+                dirty.append(self._piece_rect)
+            for x, y in piece.cells:
+                self.draw_cell(self.screen, piece.color, (piece.x + x) * cell_size,
+                               (piece.y + y) * cell_size, cell_size)
+            state = piece.state
+            self._piece_rect = pygame.Rect(piece.x * cell_size, piece.y * cell_size,
+                                           state.width * cell_size, state.height * cell_size).clip(board_rect)
+            self._piece_key = piece_key
+            dirty.append(self._piece_rect)
+
+        if self.score != self._score_key:
+            if self._score_rect:
+                self.screen.blit(self._static_layer, self._score_rect, self._score_rect)
+                dirty.append(self._score_rect)
+            score_text = render_text(f"Score: {self.score}", 24, WHITE)
+            self._score_rect = self.screen.blit(score_text, (panel_x + 20, 20))
+            self._score_key = self.score
+            dirty.append(self._score_rect)
+
+        if self.status != self._status_key:
+            if self._status_rect:
+                self.screen.blit(self._static_layer, self._status_rect, self._status_rect)
+                dirty.append(self._status_rect)
+                self._status_rect = None
+            if self.status:
+                status_text = render_text(self.status, 20, WHITE)
+                self._status_rect = self.screen.blit(status_text, (panel_x + 20, 340))
+                dirty.append(self._status_rect)
+            self._status_key = self.status
+
+        if self.next is not self._next_key:
+            if self._next_rect:
+                self.screen.blit(self._static_layer, self._next_rect, self._next_rect)
+                dirty.append(self._next_rect)
+            next_panel_height = 150
+            next_shape_width = self.next.state.width * cell_size
+            next_shape_height = self.next.state.height * cell_size
+            start_x = panel_x + (panel_width - next_shape_width) // 2
+            start_y = 100 + (next_panel_height - next_shape_height - 40) // 2
+            for x, y in self.next.cells:
+                self.draw_cell(self.screen, self.next.color, start_x + x * cell_size,
+                               start_y + y * cell_size, cell_size, grid=False)
+            self._next_rect = pygame.Rect(start_x, start_y, next_shape_width, next_shape_height)
+            self._next_key = self.next
+            dirty.append(self._next_rect)
+
+        return dirty
 
 def draw_label(surface, text, size, color, x, y):
-    font = pygame.font.SysFont("Arial", size)
-    label = font.render(text, True, color)
+    label = render_text(text, size, color)
     rect = label.get_rect(center=(x, y + label.get_height() // 2))
     surface.blit(label, rect)
 
-def run_game(screen, multiplayer=False, mode="normal"):
+def run_game(screen, multiplayer=False, mode="normal", notifications=None, ai_player=False, net=None):
+    # ai_player: за второго игрока играет компьютер (ai.py)
+    # net: подключение netplay.NetClient - второй игрок на другой машине
+    multiplayer = multiplayer or ai_player or net is not None
     pygame.display.set_caption("Tetris")
     clock = pygame.time.Clock()
     
-    game1 = Game(screen)
-    if mode == "rating":
-        game1.base_fall_speed = 800
-        game1.fall_speed = game1.base_fall_speed
-        game1.speed_increase_interval = 5
-    game2 = Game(screen) if multiplayer else None
+    # Оба игрока читают одну заранее посчитанную очередь фигур.
+    # Сиды очередей (и после рестартов) выводятся из одного сида записи.
+    randomizer_kind = config.RATING_RANDOMIZER if mode == "rating" else config.RANDOMIZER
+    seed = random.getrandbits(32)
+    if net:
+        # Сид и настройки общие для обеих машин - их назначил ретранслятор
+        mode, randomizer_kind, seed = net.mode, net.randomizer, net.seed
+    replay = Replay(seed, mode, randomizer_kind, 2 if multiplayer else 1)
+    queue_seeds = replay.queue_seeds()
+    queue = PieceQueue(make_randomizer(randomizer_kind, queue_seeds.getrandbits(32)))
+    game1 = Game(screen, randomizer=queue.cursor(), mode=mode)
+    game2 = Game(screen, randomizer=queue.cursor(), mode=mode) if multiplayer else None
+    bot = AIPlayer(game2) if ai_player else None
+    # По сети свой игрок управляется своими клавишами, ввод копится до шага логики
+    net_keys = (PLAYER1_KEYS, PLAYER2_KEYS)[net.player] if net else None
+    net_pending = []
 
     running = True
     winner_declared = False
@@ -424,43 +390,77 @@ def run_game(screen, multiplayer=False, mode="normal"):
     winner_font_size = 40
     winner_anim_time = 0
 
+    def restart(player=0):
+        nonlocal queue, winner_declared, winner_alpha, winner_font_size
+        replay.record(player, RESTART)
+        queue = PieceQueue(make_randomizer(randomizer_kind, queue_seeds.getrandbits(32)))
+        game1.restart(queue.cursor())
+        if multiplayer:
+            game2.restart(queue.cursor())
+        winner_declared = False
+        winner_alpha = 0
+        winner_font_size = 40
+
+    def declare_winner():
+        nonlocal winner_text, winner_declared
+        if game1.game_over and not game2.game_over:
+            winner_text = f"Player 2 WINS! Score: {game2.score}"
+            winner_declared = True
+        elif game2.game_over and not game1.game_over:
+            winner_text = f"Player 1 WINS! Score: {game1.score}"
+            winner_declared = True
+        elif game1.game_over and game2.game_over:
+            if game1.score > game2.score:
+                winner_text = f"Player 1 WINS! {game1.score}-{game2.score}"
+            elif game2.score > game1.score:
+                winner_text = f"Player 2 WINS! {game2.score}-{game1.score}"
+            else:
+                winner_text = f"DRAW! Score: {game1.score}"
+            winner_declared = True
+
+    # Области экрана игроков и затемнение создаются заново только при смене размера окна
+    viewport_size = None
+    overlay = None
+
+    # Сообщения, переданные с экрана входа, показываются поверх начала партии
+    notifications = notifications or Notifications()
+    toast_shown = False
+
+    # Логика идёт фиксированными шагами по config.TICK_RATE, кадры рисуются
+    # со своей частотой: медленная отрисовка не меняет темп игры
+    tick_ms = 1000 // config.TICK_RATE
+    replay.step_ms = tick_ms
+    accumulator = 0
+
     while running:
-        dt = clock.tick(60)
-        screen.fill(BLACK)
+        dt = min(clock.tick(config.RENDER_FPS), config.MAX_FRAME_TIME)
         width, height = screen.get_size()
+        dirty = None
         
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
                 return {"quit": True}
                 
+            elif event.type == pygame.KEYDOWN and net:
+                if event.key == pygame.K_ESCAPE:
+                    return {"menu": True}
+                if event.key in net_keys:
+                    net_pending.append(net_keys[event.key])
+                elif (game1.game_over or game2.game_over) and event.key == pygame.K_r:
+                    net_pending.append(RESTART)
+
             elif event.type == pygame.KEYDOWN:
                 # Обработка управления для игрока 1
-                if not game1.game_over and not winner_declared:
-                    if event.key == pygame.K_a:
-                        game1.move(-1)
-                    elif event.key == pygame.K_d:
-                        game1.move(1)
-                    elif event.key == pygame.K_s:
-                        game1.update(100)
-                    elif event.key == pygame.K_w:
-                        game1.rotate()
-                    elif event.key == pygame.K_LSHIFT:
-                        game1.drop()
-                
+                if not game1.game_over and not winner_declared and event.key in PLAYER1_KEYS:
+                    game1.apply(PLAYER1_KEYS[event.key])
+                    replay.record(0, PLAYER1_KEYS[event.key])
+
                 # Обработка управления для игрока 2 (в мультиплеере)
-                if multiplayer and game2 and not game2.game_over and not winner_declared:
-                    if event.key == pygame.K_LEFT:
-                        game2.move(-1)
-                    elif event.key == pygame.K_RIGHT:
-                        game2.move(1)
-                    elif event.key == pygame.K_DOWN:
-                        game2.update(100)
-                    elif event.key == pygame.K_UP:
-                        game2.rotate()
-                    elif event.key == pygame.K_SPACE:
-                        game2.drop()
-                
+                if multiplayer and not bot and not game2.game_over and not winner_declared and event.key in PLAYER2_KEYS:
+                    game2.apply(PLAYER2_KEYS[event.key])
+                    replay.record(1, PLAYER2_KEYS[event.key])
+
                 # Общие клавиши
                 if event.key == pygame.K_ESCAPE:
                     # В рейтинговом режиме возвращаем результат при ESC
@@ -471,24 +471,74 @@ def run_game(screen, multiplayer=False, mode="normal"):
                             "level": game1.level if not multiplayer else max(game1.level, game2.level if game2 else 0),
                             "lines": game1.lines_cleared_total if not multiplayer else max(game1.lines_cleared_total, game2.lines_cleared_total if game2 else 0)
                         }
+                        result["replay"] = replay.finish(result)
                         return result
                     else:
                         return {"menu": True}
                 
                 # Обработка рестарта
                 if (game1.game_over or (multiplayer and game2 and game2.game_over)) and event.key == pygame.K_r:
-                    game1.restart()
-                    if multiplayer:
-                        game2.restart()
-                    winner_declared = False
-                    winner_alpha = 0
-                    winner_font_size = 40
-
-        # Логика игры и отрисовка
-        if not multiplayer:
+                    restart()
+
+        if net and net.closed:
+            return {"disconnected": True}
+
+        # Шаги логики за прошедшее время
+        accumulator += dt
+        while accumulator >= tick_ms:
+            if net:
+                # Шаг выполняется, только когда пришёл ввод обоих игроков на него
+                actions = net.advance(net_pending)
+                if actions is None:
+                    accumulator = min(accumulator, tick_ms)
+                    break
+                for player, (game, player_actions) in enumerate(zip((game1, game2), actions)):
+                    for action in player_actions:
+                        if action == RESTART:
+                            restart(player)
+                        elif not game.game_over and not winner_declared:
+                            game.apply(action)
+                            replay.record(player, action)
+            accumulator -= tick_ms
+            if winner_declared or (game1.game_over and (not multiplayer or game2.game_over)):
+                # Партия стоит - шаги не копятся и не пишутся в запись
+                if multiplayer and not winner_declared:
+                    # Оба проиграли от нажатий в одном кадре - до обновления дело не дошло
+                    declare_winner()
+                accumulator = 0
+                break
+            if bot:
+                # Ходы компьютера пишутся в запись как обычный ввод второго игрока
+                action = bot.act(tick_ms)
+                if action:
+                    game2.apply(action)
+                    replay.record(1, action)
+            replay.step()
             if not game1.game_over:
-                game1.update(dt)
-            game1.draw_board(width, height, player_num=1)
+                game1.update(tick_ms)
+            if multiplayer and not game2.game_over:
+                game2.update(tick_ms)
+
+            if multiplayer:
+                declare_winner()
+
+        # Отрисовка. Пока видно сообщение (и один кадр после), поля
+        # перерисовываются целиком - сообщение лежит поверх них
+        if net:
+            (game1, game2)[net.player].status = f"RTT: {net.rtt} ms" if net.rtt is not None else "RTT: ..."
+
+        toast_visible = bool(notifications)
+        if toast_visible or toast_shown:
+            game1.invalidate()
+            if game2:
+                game2.invalidate()
+        toast_shown = toast_visible
+
+        if not multiplayer:
+            if game1.game_over:
+                # Надпись проявляется поверх поля - кадр перерисовывается целиком
+                game1.invalidate()
+            dirty = game1.draw_board(width, height, player_num=1)
             if game1.game_over:
                 game1.draw_game_over(dt, width, height)
                 
@@ -500,45 +550,28 @@ def run_game(screen, multiplayer=False, mode="normal"):
                         "level": game1.level,
                         "lines": game1.lines_cleared_total
                     }
+                    result["replay"] = replay.finish(result)
                     return result
         else:
             # Логика для мультиплеера (остается без изменений)
             half_width = width // 2
 
-            surface1 = pygame.Surface((half_width, height))
-            game1.screen = surface1
-            game1.draw_board(half_width, height, player_num=1)
-            
-            surface2 = pygame.Surface((half_width, height))
-            game2.screen = surface2
-            game2.draw_board(half_width, height, player_num=2)
-
-            screen.blit(surface1, (0, 0))
-            screen.blit(surface2, (half_width, 0))
-
-            pygame.draw.line(screen, WHITE, (half_width, 0), (half_width, height), 2)
-
-            if not winner_declared:
-                if not game1.game_over:
-                    game1.update(dt)
-                if not game2.game_over:
-                    game2.update(dt)
-
-            if not winner_declared:
-                if game1.game_over and not game2.game_over:
-                    winner_text = f"Player 2 WINS! Score: {game2.score}"
-                    winner_declared = True
-                elif game2.game_over and not game1.game_over:
-                    winner_text = f"Player 1 WINS! Score: {game1.score}"
-                    winner_declared = True
-                elif game1.game_over and game2.game_over:
-                    if game1.score > game2.score:
-                        winner_text = f"Player 1 WINS! {game1.score}-{game2.score}"
-                    elif game2.score > game1.score:
-                        winner_text = f"Player 2 WINS! {game2.score}-{game1.score}"
-                    else:
-                        winner_text = f"DRAW! Score: {game1.score}"
-                    winner_declared = True
+            if viewport_size != (width, height):
+                screen.fill(BLACK)
+                game1.screen = screen.subsurface((0, 0, half_width, height))
+                game2.screen = screen.subsurface((half_width, 0, half_width, height))
+                overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+                overlay.fill((0, 0, 0, 180))
+                viewport_size = (width, height)
+
+            if winner_declared:
+                # Затемнение лежит поверх полей - перерисовываем их целиком
+                game1.invalidate()
+                game2.invalidate()
+            dirty = game1.draw_board(half_width, height, player_num=1)
+            dirty += [rect.move(half_width, 0) for rect in game2.draw_board(half_width, height, player_num=2)]
+
+            dirty.append(pygame.draw.line(screen, WHITE, (half_width, 0), (half_width, height), 2))
 
             if winner_declared:
                 winner_anim_time += dt
@@ -547,19 +580,14 @@ def run_game(screen, multiplayer=False, mode="normal"):
                 if winner_font_size < 80:
                     winner_font_size += dt * 0.05
 
-                overlay = pygame.Surface((width, height), pygame.SRCALPHA)
-                overlay.fill((0, 0, 0, 180))
                 screen.blit(overlay, (0, 0))
+                dirty = None
 
-                font = pygame.font.SysFont("Arial", int(winner_font_size))
-                text = font.render(winner_text, True, RED)
-                text.set_alpha(min(255, int(winner_alpha)))
+                text = render_text(winner_text, winner_font_size, RED, alpha=winner_alpha)
                 rect = text.get_rect(center=(width // 2, height // 2 - 30))
                 screen.blit(text, rect)
                 
-                small_font = pygame.font.SysFont("Arial", 24)
-                hint = small_font.render("Press R to Restart", True, WHITE)
-                hint.set_alpha(min(255, int(winner_alpha)))
+                hint = render_text("Press R to Restart", 24, WHITE, alpha=winner_alpha)
                 hint_rect = hint.get_rect(center=(width // 2, height // 2 + 30))
                 screen.blit(hint, hint_rect)
 
@@ -571,9 +599,18 @@ def run_game(screen, multiplayer=False, mode="normal"):
                         "level": max(game1.level, game2.level if game2 else 0),
                         "lines": max(game1.lines_cleared_total, game2.lines_cleared_total if game2 else 0)
                     }
+                    result["replay"] = replay.finish(result)
                     return result
 
-        pygame.display.flip()
+        if toast_visible:
+            notifications.draw(screen)
+            notifications.update(dt)
+            dirty = None
+
+        if dirty is None:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
 
     # Возвращаем результат только при явном выходе (не при рестарте)
     return {"quit": True}
@@ -1,10 +1,15 @@
 import pygame
+from assets import get_assets
 from menu import main_menu
 
 def main():
+    assets = get_assets()
     pygame.init()
     screen = pygame.display.set_mode((1920, 1080))
     pygame.display.set_caption("Multiplayer Tetris")
+    assets.mark("окно")
+    # Ресурсы грузятся в фоне, пока уже показывается меню
+    assets.start()
     main_menu(screen)
     pygame.mixer.music.stop()
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 import pygame
 import sys
 import math
+from fonts import render_text
+from assets import get_assets
 
 # Цвета
 WHITE = (255, 255, 255)
@@ -53,8 +55,7 @@ TETRIS_LETTERS = {
 }
 
 def draw_text(screen, text, size, x, y, color=WHITE):
-    font = pygame.font.SysFont("Arial", size, bold=True)
-    label = font.render(text, True, color)
+    label = render_text(text, size, color, bold=True)
     rect = label.get_rect(center=(x, y))
     screen.blit(label, rect)
 
@@ -63,33 +64,55 @@ def draw_button(screen, text, rect, color, hover=False):
     pygame.draw.rect(screen, base_color, rect, border_radius=12)
     draw_text(screen, text, 30, rect.centerx, rect.centery)
 
-def draw_tetris_logo(screen, start_x, start_y, block_size, pulse_scale=1.0):
-    x = start_x
-    color_idx = 0
+# Логотип рисуется один раз на каждый размер; пульсация округляется до
+# сотых долей, поэтому в кэше лежит лишь десяток готовых поверхностей
+LOGO_SCALE_STEPS = 100
+_logo_cache = {}
+
+def render_tetris_logo(start_x, start_y, block_size, pulse_scale=1.0):
+    # Координаты считаются как на экране и сдвигаются к началу поверхности,
+    # чтобы округление совпадало с прямой отрисовкой
+    key = (start_x, start_y, block_size, pulse_scale)
+    logo = _logo_cache.get(key)
+    if logo is not None:
+        return logo
+
+    scaled = block_size * pulse_scale
+    letters = "TETRIS"
+    width = int((len(letters) * 6 - 1) * scaled) + 2
+    height = int(5 * scaled) + 2
+    logo = pygame.Surface((width, height), pygame.SRCALPHA)
 
-    for letter in "TETRIS":
+    x = start_x
+    for color_idx, letter in enumerate(letters):
         pattern = TETRIS_LETTERS[letter]
         color = TETRIS_COLORS[color_idx % len(TETRIS_COLORS)]
-        color_idx += 1
 
         for row_idx, row in enumerate(pattern):
             for col_idx, char in enumerate(row):
                 if char == "#":
                     rect = pygame.Rect(
-                        x + col_idx * block_size * pulse_scale,
-                        start_y + row_idx * block_size * pulse_scale,
-                        block_size * pulse_scale,
-                        block_size * pulse_scale
-                    )
-                    pygame.draw.rect(screen, color, rect)
-                    pygame.draw.rect(screen, BLACK, rect, 2)
+                        x + col_idx * scaled,
+                        start_y + row_idx * scaled,
+                        scaled,
+                        scaled
+                    ).move(-start_x, -start_y)
+                    pygame.draw.rect(logo, color, rect)
+                    pygame.draw.rect(logo, BLACK, rect, 2)
+
+        x += (len(pattern[0]) + 1) * scaled
 
-        x += (len(pattern[0]) + 1) * block_size * pulse_scale
+    _logo_cache[key] = logo
+    return logo
+
+def draw_tetris_logo(screen, start_x, start_y, block_size, pulse_scale=1.0):
+    pulse_scale = round(pulse_scale * LOGO_SCALE_STEPS) / LOGO_SCALE_STEPS
+    screen.blit(render_tetris_logo(start_x, start_y, block_size, pulse_scale), (start_x, start_y))
 
 def main_menu(screen):
-    pygame.mixer.music.load("assets/MenuTheme.mp3")
-    pygame.mixer.music.set_volume(0.5)
-    pygame.mixer.music.play(-1)
+    # Музыка и остальные ресурсы подгружаются в фоне (assets.py), меню рисуется сразу
+    assets = get_assets().start()
+    music_started = assets.play_music()
     clock = pygame.time.Clock()
     width, height = screen.get_size()
 
@@ -128,7 +151,14 @@ def main_menu(screen):
         draw_button(screen, "5. Настройки", button5_rect, (100, 100, 255), button5_rect.collidepoint(mouse_pos))
         draw_button(screen, "6. Выйти", button6_rect, RED, button6_rect.collidepoint(mouse_pos))
 
+        if not assets.ready.is_set():
+            draw_text(screen, f"Загрузка... {int(assets.progress() * 100)}%", 20, width // 2, height - 30)
+        if not music_started and assets.music is not None:
+            music_started = assets.play_music()
+
         pygame.display.flip()
+        if frame == 0:
+            assets.mark("первый кадр")
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -152,7 +182,8 @@ def main_menu(screen):
                     pygame.mixer.music.stop()
                     from toptable import show_highscores
                     show_highscores(screen)
-                    pygame.mixer.music.play(-1)  # Возобновляем музыку после возврата
+                    if music_started:
+                        pygame.mixer.music.play(-1)  # Возобновляем музыку после возврата
                 elif event.key == pygame.K_5:
                     print("Настройки")
                 elif event.key == pygame.K_6 or event.key == pygame.K_ESCAPE:
@@ -176,7 +207,8 @@ def main_menu(screen):
                     pygame.mixer.music.stop()
                     from toptable import show_highscores
                     show_highscores(screen)
-                    pygame.mixer.music.play(-1)  # Возобновляем музыку после возврата
+                    if music_started:
+                        pygame.mixer.music.play(-1)  # Возобновляем музыку после возврата
                 elif button5_rect.collidepoint(event.pos):
                     print("Настройки")
                 elif button6_rect.collidepoint(event.pos):
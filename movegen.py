@@ -0,0 +1,228 @@
+import copy
+import random
+import sys
+import time
+from collections import namedtuple
+from bitboard import PAD
+from engine import ROTATIONS, Engine, MOVE_LEFT, MOVE_RIGHT, ROTATE, SOFT_DROP, HARD_DROP
+
+# Перебор всех конечных положений текущей фигуры, достижимых по правилам
+# Engine ходами игрока: влево, вправо, поворот (без отскоков) и шаг вниз.
+# Так находятся и "подсовывания" под нависающие блоки. Положения с одинаковым
+# набором клеток (у O, S, Z, I повороты совпадают) возвращаются один раз.
+# Считается, что игрок успевает сделать ходы до очередного шага гравитации.
+#
+# placements обходит поле построчно битовыми масками: для каждой строки и
+# поворота считается маска допустимых сдвигов, достижимые сдвиги
+# растекаются по ней влево-вправо и между поворотами, затем переходят на
+# строку ниже. Путь ввода для положения ищет обход в ширину по состояниям
+# (поворот, x, y) - он нужен обычно только для одного выбранного положения.
+
+# masks и x, y однозначно задают клетки фигуры на поле; path - действия
+# из engine, приводящие фигуру в это положение и фиксирующие её (или None)
+Placement = namedtuple("Placement", "rotation x y masks path")
+
+# Клетки каждого поворота как (строка, столбец) - для масок допустимых сдвигов
+ROTATION_CELLS = {name: tuple(tuple(state.cells) for state in states) for name, states in ROTATIONS.items()}
+
+
+def placements(board, kind, x, y, rotation=0):
+    states = ROTATIONS[kind]
+    cells = ROTATION_CELLS[kind]
+    heights = [state.height for state in states]
+    rows = board.rows
+    height = board.height
+    walls = board.walls
+    span = (1 << (PAD + board.columns)) - 1
+
+    # Маска сдвигов p = x + PAD, при которых поворот r помещается в строке y
+    def free(r, y):
+        if y + heights[r] > height:
+            return 0
+        blocked = 0
+        for cx, cy in cells[r]:
+            row = y + cy
+            blocked |= (rows[row] if row >= 0 else walls) >> cx
+        return ~blocked & span
+
+    row_free = [free(r, y) for r in range(4)]
+    reach = [0, 0, 0, 0]
+    reach[rotation] = (1 << (x + PAD)) & row_free[rotation]
+    if not reach[rotation]:
+        return []
+
+    result = []
+    seen = set()
+    while any(reach):
+        # Внутри строки: сдвиги влево-вправо и повороты, пока множество растёт
+        changed = True
+        while changed:
+            changed = False
+            for r in range(4):
+                m = reach[r]
+                if not m:
+                    continue
+                f = row_free[r]
+                while True:
+                    spread = m | ((m << 1) | (m >> 1)) & f
+                    if spread == m:
+                        break
+                    m = spread
+                reach[r] = m
+                r2 = (r + 1) % 4
+                rotated = m & row_free[r2] & ~reach[r2]
+                if rotated:
+                    reach[r2] |= rotated
+                    changed = True
+
+        next_free = [free(r, y + 1) for r in range(4)]
+        for r in range(4):
+            landed = reach[r] & ~next_free[r]
+            while landed:
+                low = landed & -landed
+                landed ^= low
+                key = (states[r].masks, low.bit_length() - 1 - PAD, y)
+                if key not in seen:
+                    seen.add(key)
+                    result.append(Placement(r, key[1], y, key[0], None))
+            reach[r] &= next_free[r]
+        row_free = next_free
+        y += 1
+    return result
+
+
+def search(board, kind, x, y, rotation=0, target=None):
+    # Обход в ширину с путями. Без target - все положения с путями,
+    # с target (поворот, x, y) - только путь к нему (или None)
+    masks_of = [state.masks for state in ROTATIONS[kind]]
+    rows = board.rows
+    height = board.height
+    walls = board.walls
+    limit = PAD + board.columns
+
+    # То же, что BitBoard.collides, но без вызова метода на каждую проверку
+    def fits(masks, x, y):
+        shift = x + PAD
+        if shift < 0 or shift >= limit or y + len(masks) > height:
+            return False
+        for i, mask in enumerate(masks):
+            row = y + i
+            if (rows[row] if row >= 0 else walls) & (mask << shift):
+                return False
+        return True
+
+    start = (rotation, x, y)
+    if not fits(masks_of[rotation], x, y):
+        return None if target else []
+
+    parent = {start: None}
+    queue = [start]
+    landings = {}
+    for state in queue:
+        r, x, y = state
+        for action, nxt in ((MOVE_LEFT, (r, x - 1, y)), (MOVE_RIGHT, (r, x + 1, y)),
+                            (ROTATE, ((r + 1) % 4, x, y))):
+            if nxt not in parent and fits(masks_of[nxt[0]], nxt[1], nxt[2]):
+                parent[nxt] = (state, action)
+                queue.append(nxt)
+
+        down = (r, x, y + 1)
+        if down in parent:
+            continue
+        if fits(masks_of[r], x, y + 1):
+            parent[down] = (state, SOFT_DROP)
+            queue.append(down)
+        else:
+            # Положение с теми же клетками, но другим поворотом, тоже подходит
+            key = (masks_of[r], x, y)
+            if target and key == (masks_of[target[0]], target[1], target[2]):
+                return path_to(parent, state)
+            if key not in landings:
+                landings[key] = state
+
+    if target:
+        return None
+    return [Placement(state[0], x, y, masks, path_to(parent, state))
+            for (masks, x, y), state in landings.items()]
+
+
+def path_to(parent, state):
+    path = []
+    while parent[state] is not None:
+        state, action = parent[state]
+        path.append(action)
+    path.reverse()
+    # Шаги вниз в конце пути заменяет жёсткий сброс - он же фиксирует фигуру
+    while path and path[-1] == SOFT_DROP:
+        path.pop()
+    path.append(HARD_DROP)
+    return path
+
+
+def generate(engine, paths=False):
+    piece = engine.current
+    if paths:
+        return search(engine.board, piece.kind, piece.x, piece.y, piece.rotation)
+    return placements(engine.board, piece.kind, piece.x, piece.y, piece.rotation)
+
+
+def find_path(engine, placement):
+    piece = engine.current
+    return search(engine.board, piece.kind, piece.x, piece.y, piece.rotation,
+                  (placement.rotation, placement.x, placement.y))
+
+
+def check_paths(games=20, pieces=30, seed=0):
+    # Оба перебора дают одни и те же положения, а каждый путь, проигранный
+    # на копии Engine, приводит фигуру ровно в своё положение
+    rng = random.Random(seed)
+    for i in range(games):
+        engine = Engine(seed=i)
+        for _ in range(pieces):
+            if engine.game_over:
+                break
+            found = generate(engine, paths=True)
+            fast = generate(engine)
+            cells = {(p.masks, p.x, p.y) for p in found}
+            if len(cells) != len(found) or cells != {(p.masks, p.x, p.y) for p in fast}:
+                return False
+            for placement in found + [p._replace(path=find_path(engine, p)) for p in fast]:
+                trial = copy.deepcopy(engine)
+                for action in placement.path[:-1]:
+                    trial.apply(action)
+                piece = trial.current
+                # Падение жёсткого сброса, но без фиксации
+                while trial.valid_position(piece.masks, piece.x, piece.y + 1):
+                    piece.y += 1
+                if (piece.masks, piece.x, piece.y) != (placement.masks, placement.x, placement.y):
+                    return False
+            for action in rng.choice(found).path:
+                engine.apply(action)
+    return True
+
+
+def benchmark(games=20, pieces=50):
+    # Поля из случайных партий: замеряется только перебор положений
+    rng = random.Random(0)
+    positions = []
+    for i in range(games):
+        engine = Engine(seed=i)
+        for _ in range(pieces):
+            if engine.game_over:
+                break
+            piece = engine.current
+            positions.append((copy.deepcopy(engine.board), piece.kind, piece.x, piece.y, piece.rotation))
+            for action in rng.choice(generate(engine, paths=True)).path:
+                engine.apply(action)
+    start = time.perf_counter()
+    total = sum(len(placements(*position)) for position in positions)
+    elapsed = time.perf_counter() - start
+    print(f"{len(positions) / elapsed:,.0f} позиций/с, {total / len(positions):.1f} положений на позицию "
+          f"({len(positions)} позиций за {elapsed:.2f} с)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "check":
+        print("OK" if check_paths() else "РАСХОЖДЕНИЕ")
+    else:
+        benchmark()
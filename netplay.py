@@ -0,0 +1,290 @@
+import asyncio
+import random
+import struct
+import sys
+import threading
+import time
+import config
+from replay import MODE_CODES, RANDOMIZER_CODES
+
+# Игра вдвоём по сети через ретранслятор. Клиенты обмениваются только
+# вводом: каждый шаг логики клиент отправляет свои действия на шаг
+# tick + задержка ввода, а шаг выполняется, когда пришёл ввод обоих
+# (lockstep). Правила детерминированы при общем сиде, поэтому обе копии
+# партии совпадают без пересылки состояния.
+#
+# Кадр: заголовок <BH (тип, длина данных) и данные:
+#   HELLO  <BBB  версия, режим, генератор фигур
+#   START  <BIBBB  номер игрока, сид, задержка ввода (в шагах), режим, генератор
+#   INPUT  <I и по байту на действие  шаг, действия
+#   PING/PONG  <d  время отправки (PONG возвращает его отправителю)
+# Сервер читает только HELLO, дальше пересылает байты соперника как есть.
+PROTOCOL_VERSION = 1
+HELLO, START, INPUT, PING, PONG = range(1, 6)
+FRAME = struct.Struct("<BH")
+HELLO_DATA = struct.Struct("<BBB")
+START_DATA = struct.Struct("<BIBBB")
+TICK = struct.Struct("<I")
+STAMP = struct.Struct("<d")
+PING_INTERVAL = 0.5  # секунд между замерами задержки
+
+
+def frame(kind, data=b""):
+    return FRAME.pack(kind, len(data)) + data
+
+
+async def read_frame(reader):
+    kind, length = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return kind, await reader.readexactly(length)
+
+
+class RelayServer:
+    # Сводит подключившихся по двое и пересылает каждому кадры соперника
+    def __init__(self, delay=config.NET_INPUT_DELAY):
+        self.delay = delay
+        self.waiting = None  # (writer, hello, future) ожидающего соперника клиента
+
+    async def handle(self, reader, writer):
+        try:
+            kind, data = await read_frame(reader)
+            version, mode, randomizer = HELLO_DATA.unpack(data)
+            if kind != HELLO or version != PROTOCOL_VERSION:
+                raise ValueError("Неизвестный клиент")
+        except (asyncio.IncompleteReadError, ValueError, struct.error):
+            writer.close()
+            return
+
+        first_read = None
+        if self.waiting is None:
+            peer = asyncio.get_running_loop().create_future()
+            self.waiting = (writer, (mode, randomizer), peer)
+            # До START клиент молчит, поэтому чтение во время ожидания
+            # завершается только при отключении (или нарушении протокола)
+            first_read = asyncio.ensure_future(reader.read(4096))
+            await asyncio.wait((peer, first_read), return_when=asyncio.FIRST_COMPLETED)
+            if not peer.done():
+                if self.waiting is not None and self.waiting[2] is peer:
+                    self.waiting = None
+                first_read.cancel()
+                writer.close()
+                return
+            other = peer.result()
+        else:
+            other, (mode, randomizer), peer = self.waiting
+            self.waiting = None
+            seed = random.getrandbits(32)
+            other.write(frame(START, START_DATA.pack(0, seed, self.delay, mode, randomizer)))
+            writer.write(frame(START, START_DATA.pack(1, seed, self.delay, mode, randomizer)))
+            peer.set_result(writer)
+
+        try:
+            while True:
+                if first_read is not None:
+                    data = await first_read
+                    first_read = None
+                else:
+                    data = await reader.read(4096)
+                if not data:
+                    break
+                other.write(data)
+        except ConnectionError:
+            pass
+        finally:
+            other.close()
+            writer.close()
+
+
+async def serve(host, port, delay=config.NET_INPUT_DELAY, started=None):
+    server = await asyncio.start_server(RelayServer(delay).handle, host, port)
+    if started is not None:
+        started(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+
+class NetClient:
+    # Подключение к ретранслятору. Сеть работает в своём потоке с циклом
+    # asyncio, игровой цикл вызывает advance() на каждом шаге логики
+    def __init__(self, host, port, mode="normal", randomizer=config.RANDOMIZER, timeout=60):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="netplay", daemon=True)
+        self.thread.start()
+        self.writer = None
+        self.closed = False
+        self.rtt = None  # мс, по последнему PONG
+        self.tick = 0
+        self.sent_tick = 0
+        self.inputs = ({}, {})  # игрок -> {шаг: действия}
+        self.tasks = []
+        future = asyncio.run_coroutine_threadsafe(self.connect(host, port, mode, randomizer), self.loop)
+        try:
+            future.result(timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    async def connect(self, host, port, mode, randomizer):
+        reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(frame(HELLO, HELLO_DATA.pack(PROTOCOL_VERSION, MODE_CODES.index(mode),
+                                                        RANDOMIZER_CODES.index(randomizer))))
+        kind, data = await read_frame(reader)
+        if kind != START:
+            raise ConnectionError("Сервер не начал партию")
+        self.player, self.seed, self.delay, mode, randomizer = START_DATA.unpack(data)
+        self.mode = MODE_CODES[mode]
+        self.randomizer = RANDOMIZER_CODES[randomizer]
+        self.remote = 1 - self.player
+        self.tasks = [self.loop.create_task(self.receive(reader)), self.loop.create_task(self.ping())]
+
+    async def receive(self, reader):
+        try:
+            while True:
+                kind, data = await read_frame(reader)
+                if kind == INPUT:
+                    self.inputs[self.remote][TICK.unpack_from(data)[0]] = list(data[TICK.size:])
+                elif kind == PING:
+                    self.writer.write(frame(PONG, data))
+                elif kind == PONG:
+                    self.rtt = round((time.perf_counter() - STAMP.unpack(data)[0]) * 1000)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self.closed = True
+
+    async def ping(self):
+        while not self.closed:
+            self.writer.write(frame(PING, STAMP.pack(time.perf_counter())))
+            await asyncio.sleep(PING_INTERVAL)
+
+    def send(self, data):
+        self.loop.call_soon_threadsafe(self.writer.write, data)
+
+    def advance(self, pending):
+        # Ввод из pending уходит на шаг tick + delay (один раз на шаг) и
+        # очищается. Возвращает действия обоих игроков на текущий шаг или
+        # None, если ввода соперника ещё нет - тогда шаг нужно повторить позже
+        if self.sent_tick <= self.tick:
+            target = self.tick + self.delay
+            self.inputs[self.player][target] = list(pending)
+            self.send(frame(INPUT, TICK.pack(target) + bytes(pending)))
+            pending.clear()
+            self.sent_tick = self.tick + 1
+
+        if self.tick >= self.delay:
+            if any(self.tick not in inputs for inputs in self.inputs):
+                return None
+            actions = tuple(inputs.pop(self.tick) for inputs in self.inputs)
+        else:
+            actions = ([], [])
+        self.tick += 1
+        return actions
+
+    def close(self):
+        def shutdown():
+            if self.writer is not None:
+                self.writer.close()
+            for task in self.tasks:
+                task.cancel()
+            # Остановка после того, как отменённые задачи завершатся
+            self.loop.call_soon(self.loop.stop)
+        self.closed = True
+        self.loop.call_soon_threadsafe(shutdown)
+
+
+def start_server_thread(host="127.0.0.1", port=0, delay=config.NET_INPUT_DELAY):
+    # Ретранслятор в фоновом потоке; возвращает фактический порт
+    ready = threading.Event()
+    result = {}
+
+    def started(actual_port):
+        result["port"] = actual_port
+        ready.set()
+
+    thread = threading.Thread(target=lambda: asyncio.run(serve(host, port, delay, started)),
+                              name="relay", daemon=True)
+    thread.start()
+    ready.wait()
+    return result["port"]
+
+
+def self_test(ticks=3000, seed=0):
+    # Два клиента через локальный ретранслятор играют случайным вводом;
+    # обе копии партии должны совпасть шаг в шаг
+    from engine import Engine, HARD_DROP
+    from randomizer import PieceQueue, make_randomizer
+    from replay import Replay
+
+    port = start_server_thread()
+    clients = [None, None]
+
+    def join(i):
+        clients[i] = NetClient("127.0.0.1", port)
+
+    joiners = [threading.Thread(target=join, args=(i,)) for i in range(2)]
+    for joiner in joiners:
+        joiner.start()
+    for joiner in joiners:
+        joiner.join()
+
+    rng = random.Random(seed)
+    views = []
+    for client in clients:
+        seeds = Replay(client.seed).queue_seeds()
+        queue = PieceQueue(make_randomizer(client.randomizer, seeds.getrandbits(32)))
+        views.append([Engine(randomizer=queue.cursor(), mode=client.mode) for _ in range(2)])
+    pending = [[], []]
+    done = [0, 0]
+    tick_ms = 1000 // config.TICK_RATE
+    start = time.perf_counter()
+    while min(done) < ticks:
+        for i, client in enumerate(clients):
+            if done[i] >= ticks:
+                continue
+            if rng.random() < 0.2:
+                pending[i].append(rng.randint(1, HARD_DROP))
+            actions = client.advance(pending[i])
+            if actions is None:
+                continue
+            for game, player_actions in zip(views[i], actions):
+                for action in player_actions:
+                    if not game.game_over:
+                        game.apply(action)
+            for game in views[i]:
+                if not game.game_over:
+                    game.update(tick_ms)
+            done[i] += 1
+        time.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    states = [[(game.score, game.lines_cleared_total, game.game_over, tuple(game.board.rows),
+                game.current.kind, game.current.x, game.current.y) for game in view] for view in views]
+    rtts = [client.rtt for client in clients]
+    for client in clients:
+        client.close()
+    print(f"{ticks} шагов за {elapsed:.2f} с, RTT {rtts} мс")
+    return states[0] == states[1]
+
+
+if __name__ == "__main__":
+    # python netplay.py server [хост] [порт]  - ретранслятор
+    # python netplay.py client [хост] [порт]  - игра по сети
+    # python netplay.py selftest              - проверка через локальный ретранслятор
+    command = sys.argv[1] if len(sys.argv) > 1 else "selftest"
+    host = sys.argv[2] if len(sys.argv) > 2 else "127.0.0.1"
+    port = int(sys.argv[3]) if len(sys.argv) > 3 else config.NET_PORT
+    if command == "server":
+        print(f"Ретранслятор на {host}:{port}")
+        asyncio.run(serve(host, port))
+    elif command == "client":
+        import pygame
+        from game import run_game
+        pygame.init()
+        screen = pygame.display.set_mode((1920, 1080))
+        pygame.display.set_caption("Multiplayer Tetris")
+        print("Ожидание соперника...")
+        client = NetClient(host, port)
+        try:
+            run_game(screen, net=client)
+        finally:
+            client.close()
+    else:
+        print("OK" if self_test() else "РАСХОЖДЕНИЕ")
@@ -0,0 +1,66 @@
+import pygame
+from collections import deque
+from fonts import render_text
+
+# Всплывающие сообщения внизу экрана. Вместо pygame.time.delay сообщения
+# ставятся в очередь и рисуются в обычном цикле кадров, поэтому события
+# продолжают обрабатываться, а ввод не теряется.
+FADE_TIME = 250  # мс на проявление и исчезновение
+
+
+class Toast:
+    def __init__(self, text, color, duration):
+        self.text = text
+        self.color = color
+        self.duration = duration
+        self.elapsed = 0
+
+    def alpha(self):
+        left = self.duration - self.elapsed
+        return max(0, min(255, 255 * min(self.elapsed, left) // FADE_TIME))
+
+
+class Notifications:
+    def __init__(self, size=24, height=60, margin=20):
+        self.size = size
+        self.height = height
+        self.margin = margin
+        self.queue = deque()
+        self.background = None
+
+    def push(self, text, color, duration=2000):
+        self.queue.append(Toast(text, color, duration))
+
+    def clear(self):
+        self.queue.clear()
+
+    def __bool__(self):
+        return bool(self.queue)
+
+    def update(self, dt):
+        # Сообщения показываются по одному, в порядке добавления
+        while self.queue and dt > 0:
+            toast = self.queue[0]
+            step = min(dt, toast.duration - toast.elapsed)
+            toast.elapsed += step
+            dt -= step
+            if toast.elapsed >= toast.duration:
+                self.queue.popleft()
+
+    def draw(self, screen):
+        # Возвращает занятый прямоугольник (для pygame.display.update) или None
+        if not self.queue:
+            return None
+        toast = self.queue[0]
+        width, height = screen.get_size()
+        rect = pygame.Rect(0, height - self.height - self.margin, width, self.height)
+        alpha = toast.alpha()
+
+        if self.background is None or self.background.get_size() != rect.size:
+            self.background = pygame.Surface(rect.size, pygame.SRCALPHA)
+        self.background.fill((0, 0, 0, alpha * 150 // 255))
+        screen.blit(self.background, rect)
+
+        text = render_text(toast.text, self.size, toast.color, alpha=alpha)
+        screen.blit(text, text.get_rect(center=rect.center))
+        return rect
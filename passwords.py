@@ -0,0 +1,71 @@
+import hashlib
+import hmac
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+import config
+
+# Пароли хранятся как "pbkdf2_sha256$<итерации>$<соль>$<хэш>": параметры лежат
+# рядом с хэшем, поэтому стоимость можно поднимать, не ломая старые записи.
+# Записи старого формата (голый SHA-256) проверяются и перехэшируются при входе.
+ALGORITHM = "pbkdf2_sha256"
+SALT_BYTES = 16
+
+# Хэширование идёт в отдельном потоке, чтобы экран входа продолжал анимироваться
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="passwords")
+
+# Проверенные за время работы процесса входы: ник -> (запись, метка пароля).
+# Метка - HMAC на случайном ключе процесса, сам пароль не хранится.
+_session_key = secrets.token_bytes(32)
+_sessions = {}
+
+
+def hash_password(password, iterations=None):
+    iterations = iterations or config.PASSWORD_ITERATIONS
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"{ALGORITHM}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def is_legacy(record):
+    return "$" not in record
+
+
+def verify_password(password, record):
+    if is_legacy(record):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), record)
+    algorithm, iterations, salt, digest = record.split("$")
+    if algorithm != ALGORITHM:
+        return False
+    actual = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(actual.hex(), digest)
+
+
+def needs_rehash(record):
+    return is_legacy(record) or int(record.split("$")[1]) < config.PASSWORD_ITERATIONS
+
+
+def session_tag(nickname, password):
+    return hmac.new(_session_key, f"{nickname}\0{password}".encode(), hashlib.sha256).digest()
+
+
+def authenticate(nickname, password, record):
+    # Возвращает (статус, новая запись или None); статусы: "created", "ok", "wrong"
+    if record is None:
+        record = hash_password(password)
+        _sessions[nickname] = (record, session_tag(nickname, password))
+        return "created", record
+
+    session = _sessions.get(nickname)
+    if session and session[0] == record and hmac.compare_digest(session[1], session_tag(nickname, password)):
+        return "ok", None
+
+    if not verify_password(password, record):
+        return "wrong", None
+
+    new_record = hash_password(password) if needs_rehash(record) else None
+    _sessions[nickname] = (new_record or record, session_tag(nickname, password))
+    return "ok", new_record
+
+
+def authenticate_async(nickname, password, record):
+    return _executor.submit(authenticate, nickname, password, record)
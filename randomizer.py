@@ -0,0 +1,94 @@
+import random
+from collections import deque
+from engine import PIECE_NAMES
+
+
+class Randomizer:
+    # Источник фигур со своим ГСЧ: next() возвращает имя следующей фигуры
+    def __init__(self, seed=None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    def next(self):
+        raise NotImplementedError
+
+
+class UniformRandomizer(Randomizer):
+    # Каждая фигура независимо и равновероятно (как было в исходной игре)
+    def next(self):
+        return self.rng.choice(PIECE_NAMES)
+
+
+class BagRandomizer(Randomizer):
+    # "Мешок из 7": каждые 7 фигур - перестановка всех семи
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self.bag = []
+
+    def next(self):
+        if not self.bag:
+            self.bag = list(PIECE_NAMES)
+            self.rng.shuffle(self.bag)
+        return self.bag.pop()
+
+
+class HistoryRandomizer(Randomizer):
+    # Несколько попыток избежать фигур, выпавших недавно
+    def __init__(self, seed=None, history=4, tries=4):
+        super().__init__(seed)
+        self.history = deque(maxlen=history)
+        self.tries = tries
+
+    def next(self):
+        for _ in range(self.tries):
+            piece = self.rng.choice(PIECE_NAMES)
+            if piece not in self.history:
+                break
+        self.history.append(piece)
+        return piece
+
+
+RANDOMIZERS = {
+    "uniform": UniformRandomizer,
+    "bag": BagRandomizer,
+    "history": HistoryRandomizer,
+}
+
+
+def make_randomizer(kind, seed=None):
+    if kind not in RANDOMIZERS:
+        raise ValueError(f"Неизвестный генератор фигур: {kind}")
+    return RANDOMIZERS[kind](seed)
+
+
+class PieceQueue:
+    # Заранее посчитанная общая последовательность фигур; каждый игрок
+    # читает её своим курсором, поэтому оба получают одинаковые фигуры
+    def __init__(self, source, chunk=1024):
+        self.source = source
+        self.chunk = chunk
+        self.pieces = []
+        self.extend()
+
+    def extend(self):
+        self.pieces.extend(self.source.next() for _ in range(self.chunk))
+
+    def get(self, index):
+        while index >= len(self.pieces):
+            self.extend()
+        return self.pieces[index]
+
+    def cursor(self):
+        return QueueCursor(self)
+
+
+class QueueCursor(Randomizer):
+    def __init__(self, queue):
+        self.queue = queue
+        self.seed = queue.source.seed
+        self.index = 0
+
+    def next(self):
+        piece = self.queue.get(self.index)
+        self.index += 1
+        return piece
@@ -1,14 +1,20 @@
 import pygame
-import json
-import os
-import hashlib
+import random
+import passwords
+from array import array
 from datetime import datetime
 from game import run_game
 from toptable import load_highscores, show_highscores
+from scorestore import get_store
+from userstore import get_user_directory
+from fonts import render_text
+from assets import get_assets
+from notifications import Notifications
 
 # Константы
-USER_DB_FILE = "assets/users.json"
-HIGHSCORES_FILE = "assets/highscores.json"
+REPLAY_DIR = "assets/replays"
+MAX_PARTICLES = 512
+PARTICLE_SPEED = 0.1  # доля скорости, проходимая за кадр
 FONT_NAME = "Arial"
 COLORS = {
     "background": (30, 30, 40),
@@ -25,23 +31,21 @@ COLORS = {
 class AuthSystem:
     @staticmethod
     def load_users():
-        if not os.path.exists(USER_DB_FILE):
-            return {}
-        try:
-            with open(USER_DB_FILE, "r") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return {}
+        # Каталог читается с диска один раз за процесс; здесь - копия для старого API
+        users = dict(get_user_directory().users)
+        return users
 
     @staticmethod
     def save_users(users):
-        os.makedirs(os.path.dirname(USER_DB_FILE), exist_ok=True)
-        with open(USER_DB_FILE, "w") as f:
-            json.dump(users, f, indent=2)
+        # В журнал попадают только изменившиеся записи
+        directory = get_user_directory()
+        for nickname, record in users.items():
+            if directory.get(nickname) != record:
+                directory.set(nickname, record)
 
     @staticmethod
     def hash_password(password):
-        return hashlib.sha256(password.encode()).hexdigest()
+        return passwords.hash_password(password)
 
 class RatingSystem:
     @staticmethod
@@ -49,56 +53,76 @@ class RatingSystem:
         return load_highscores()
 
     @staticmethod
-    def save_highscore(nickname, score, level, lines):
-        highscores = RatingSystem.load_highscores()
-        new_entry = {
-            "nickname": nickname,
-            "score": score,
-            "level": level,
-            "lines": lines,
-            "date": pygame.time.get_ticks()
-        }
-        highscores.append(new_entry)
-        highscores.sort(key=lambda x: x["score"], reverse=True)
-        highscores = highscores[:100]
-        os.makedirs(os.path.dirname(HIGHSCORES_FILE), exist_ok=True)
-        with open(HIGHSCORES_FILE, "w") as f:
-            json.dump(highscores, f, indent=2)
+    def save_highscore(nickname, score, level, lines, replay=None):
+        # Одна вставка в индексированное хранилище вместо перезаписи всего файла
+        get_store().add(nickname, score, level, lines, replay=replay)
 
 class ParticleSystem:
-    def __init__(self):
-        self.particles = []
+    # Частицы хранятся по столбцам в массивах array: обновление идёт по плотным
+    # числам без словарей, умершая частица заменяется последней (O(1)),
+    # а рисуются частицы заранее отрисованными спрайтами одним вызовом blits
+    def __init__(self, limit=MAX_PARTICLES, seed=None):
+        self.limit = limit
+        self.rng = random.Random(seed)
+        self.x = array("f")
+        self.y = array("f")
+        self.vx = array("f")
+        self.vy = array("f")
+        self.life = array("i")
+        self.radius = array("i")
+        self.sprites = []  # спрайт каждой частицы
+        self.sprite_cache = {}  # (цвет, радиус) -> поверхность
+
+    def __len__(self):
+        return len(self.life)
+
+    def sprite(self, color, radius):
+        key = (tuple(color), radius)
+        surface = self.sprite_cache.get(key)
+        if surface is None:
+            surface = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+            pygame.draw.circle(surface, color, (radius, radius), radius)
+            self.sprite_cache[key] = surface
+        return surface
 
     def add_particles(self, pos, color, count=10):
+        # Сверх лимита частицы не добавляются - частота кадров не падает
+        count = min(count, self.limit - len(self.life))
         for _ in range(count):
-            angle = pygame.time.get_ticks() % 360  # Упрощаем расчет угла
-            velocity = pygame.math.Vector2(0, 1).rotate(angle)  # Создаем вектор и поворачиваем
-            velocity.x += (pygame.time.get_ticks() % 10) - 5  # Добавляем случайное отклонение
-            
-            self.particles.append({
-                "pos": [pos[0], pos[1]],
-                "velocity": [velocity.x, velocity.y],
-                "size": pygame.time.get_ticks() % 5 + 2,
-                "color": color,
-                "life": 60 + (pygame.time.get_ticks() % 40)
-            })
+            velocity = pygame.math.Vector2(0, 1).rotate(self.rng.uniform(0, 360))
+            velocity.x += self.rng.uniform(-5, 5)
+            radius = self.rng.randint(2, 6)
+
+            self.x.append(pos[0])
+            self.y.append(pos[1])
+            self.vx.append(velocity.x * PARTICLE_SPEED)
+            self.vy.append(velocity.y * PARTICLE_SPEED)
+            self.life.append(self.rng.randint(60, 99))
+            self.radius.append(radius)
+            self.sprites.append(self.sprite(color, radius))
 
     def update(self):
-        for particle in self.particles[:]:
-            particle["pos"][0] += particle["velocity"][0] * 0.1
-            particle["pos"][1] += particle["velocity"][1] * 0.1
-            particle["life"] -= 1
-            if particle["life"] <= 0:
-                self.particles.remove(particle)
+        x, y, vx, vy, life = self.x, self.y, self.vx, self.vy, self.life
+        columns = (x, y, vx, vy, life, self.radius, self.sprites)
+        i = 0
+        n = len(life)
+        while i < n:
+            life[i] -= 1
+            if life[i] <= 0:
+                # Удаление перестановкой: последняя частица занимает место умершей
+                n -= 1
+                for column in columns:
+                    column[i] = column[n]
+                    column.pop()
+                continue
+            x[i] += vx[i]
+            y[i] += vy[i]
+            i += 1
 
     def draw(self, screen):
-        for particle in self.particles:
-            pygame.draw.circle(
-                screen,
-                particle["color"],
-                (int(particle["pos"][0]), int(particle["pos"][1])),
-                int(particle["size"])
-            )
+        x, y, radius = self.x, self.y, self.radius
+        screen.blits([(sprite, (int(x[i]) - radius[i], int(y[i]) - radius[i]))
+                      for i, sprite in enumerate(self.sprites)], False)
 
 class LoginScreen:
     def __init__(self, screen):
@@ -106,86 +130,121 @@ class LoginScreen:
         self.width, self.height = screen.get_size()
         self.clock = pygame.time.Clock()
         self.particles = ParticleSystem()
-        self.font_large = pygame.font.SysFont(FONT_NAME, 40, bold=True)
-        self.font_medium = pygame.font.SysFont(FONT_NAME, 30, bold=True)
-        self.font_small = pygame.font.SysFont(FONT_NAME, 24)
+        self.notifications = Notifications()
         
         # Анимационные переменные
         self.title_offset = 0
         self.title_direction = 1
-        self.bg_offset = 0
+        self.layer_size = None
         
-        # Звуковые эффекты
-        self.sounds = {
-            "click": None,
-            "error": None,
-            "success": None
+        # Звуковые эффекты (загружены заранее, см. assets.py)
+        assets = get_assets()
+        self.sounds = {name: assets.sound(name) for name in ("click", "error", "success")}
+
+    def render_label(self, text, size, color, bold=False):
+        # Надпись с тенью одной поверхностью; тень смещена на 2 пикселя
+        key = (text, size, tuple(color), bold)
+        label = self.labels.get(key)
+        if label is None:
+            text_surface = render_text(text, size, color, bold, name=FONT_NAME)
+            shadow_surface = render_text(text, size, (0, 0, 0), bold, name=FONT_NAME)
+            label = pygame.Surface((text_surface.get_width() + 2, text_surface.get_height() + 2), pygame.SRCALPHA)
+            label.blit(shadow_surface, (2, 2))
+            label.blit(text_surface, (0, 0))
+            self.labels[key] = label
+        return label
+
+    def blit_label(self, label, center):
+        # Центр надписи (без учёта тени) попадает в center
+        return self.screen.blit(label, label.get_rect(center=(center[0] + 1, center[1] + 1)))
+
+    def layout(self):
+        input_width = min(400, self.width * 0.8)
+        input_height = 50
+        return {
+            "nickname": pygame.Rect((self.width - input_width) // 2, self.height // 2 - 80, input_width, input_height),
+            "password": pygame.Rect((self.width - input_width) // 2, self.height // 2, input_width, input_height),
+            "login": pygame.Rect((self.width - 200) // 2, self.height // 2 + 80, 200, 50),
+            "back": pygame.Rect(20, 20, 100, 40),
         }
-        
-        try:
-            self.sounds["click"] = pygame.mixer.Sound("assets/sounds/click.wav")
-            self.sounds["error"] = pygame.mixer.Sound("assets/sounds/error.wav")
-            self.sounds["success"] = pygame.mixer.Sound("assets/sounds/success.wav")
-        except:
-            print("Звуковые эффекты не загружены")
-
-    def draw_text(self, text, font, color, pos, align="center", shadow=False):
-        text_surface = font.render(text, True, color)
-        if align == "center":
-            text_rect = text_surface.get_rect(center=pos)
-        elif align == "left":
-            text_rect = text_surface.get_rect(topleft=pos)
-        elif align == "right":
-            text_rect = text_surface.get_rect(topright=pos)
-        
-        if shadow:
-            shadow_surface = font.render(text, True, (0, 0, 0))
-            shadow_rect = shadow_surface.get_rect(center=(pos[0]+2, pos[1]+2))
-            self.screen.blit(shadow_surface, shadow_rect)
-        
-        self.screen.blit(text_surface, text_rect)
-        return text_rect
+
+    def build_layers(self):
+        # Слои строятся один раз на разрешение; кадр затем - несколько blit
+        self.width, self.height = self.screen.get_size()
+        self.layer_size = (self.width, self.height)
+        self.rects = self.layout()
+        self.buttons = {}
+        self.fields = {}
+        self.labels = {}
+
+        # Фон под звёздами
+        self.backdrop = pygame.Surface(self.layer_size)
+        self.backdrop.fill((40, 40, 50))
+        self.stars = []
+        for i in range(20):
+            size = 1 + (i % 3)
+            star = pygame.Surface((size * 2 + 1, size * 2 + 1), pygame.SRCALPHA)
+            pygame.draw.circle(star, (100 + i * 5, 100 + i * 5, 150 + i * 5), (size, size), size)
+            self.stars.append((star, size))
+
+        # Неподвижные подписи полей
+        self.chrome = pygame.Surface(self.layer_size, pygame.SRCALPHA)
+        for name, text in (("nickname", "Никнейм:"), ("password", "Пароль:")):
+            rect = self.rects[name]
+            self.chrome.blit(render_text(text, 24, COLORS["text"], name=FONT_NAME), (rect.x, rect.y - 30))
+
+        self.title = self.render_label("РЕЙТИНГОВЫЙ РЕЖИМ", 40, COLORS["accent"], bold=True)
+
+    def ensure_layers(self):
+        if self.layer_size != self.screen.get_size():
+            self.build_layers()
 
     def draw_button(self, rect, text, is_hovered):
-        color = COLORS["primary"] if not is_hovered else COLORS["secondary"]
-        border_color = COLORS["accent"] if is_hovered else COLORS["primary"]
-        
-        # Тень
-        shadow_rect = rect.copy()
-        shadow_rect.x += 5
-        shadow_rect.y += 5
-        pygame.draw.rect(self.screen, (0, 0, 0, 100), shadow_rect, border_radius=10)
-        
-        # Основная кнопка
-        pygame.draw.rect(self.screen, color, rect, border_radius=8)
-        pygame.draw.rect(self.screen, border_color, rect, 2, border_radius=8)
-        
-        # Текст кнопки
-        text_color = COLORS["text"] if not is_hovered else COLORS["accent"]
-        self.draw_text(text, self.font_medium, text_color, rect.center, "center", True)
-        
+        key = (rect.size, text, is_hovered)
+        button = self.buttons.get(key)
+        if button is None:
+            color = COLORS["primary"] if not is_hovered else COLORS["secondary"]
+            border_color = COLORS["accent"] if is_hovered else COLORS["primary"]
+            body = pygame.Rect(0, 0, rect.width, rect.height)
+
+            button = pygame.Surface((rect.width + 5, rect.height + 5), pygame.SRCALPHA)
+            # Тень
+            pygame.draw.rect(button, (0, 0, 0), body.move(5, 5), border_radius=10)
+            # Основная кнопка
+            pygame.draw.rect(button, color, body, border_radius=8)
+            pygame.draw.rect(button, border_color, body, 2, border_radius=8)
+            # Текст кнопки
+            text_color = COLORS["text"] if not is_hovered else COLORS["accent"]
+            label = self.render_label(text, 30, text_color, bold=True)
+            button.blit(label, label.get_rect(center=(body.centerx + 1, body.centery + 1)))
+            self.buttons[key] = button
+
+        self.screen.blit(button, rect)
         return rect
 
     def draw_input_field(self, rect, text, is_active, is_password=False):
-        bg_color = COLORS["input_active"] if is_active else COLORS["input_bg"]
-        border_color = COLORS["accent"] if is_active else COLORS["primary"]
-        
-        # Тень
-        shadow_rect = rect.copy()
-        shadow_rect.x += 3
-        shadow_rect.y += 3
-        pygame.draw.rect(self.screen, (0, 0, 0, 100), shadow_rect, border_radius=5)
-        
-        # Поле ввода
-        pygame.draw.rect(self.screen, bg_color, rect, border_radius=5)
-        pygame.draw.rect(self.screen, border_color, rect, 2, border_radius=5)
+        key = (rect.size, is_active)
+        field = self.fields.get(key)
+        if field is None:
+            bg_color = COLORS["input_active"] if is_active else COLORS["input_bg"]
+            border_color = COLORS["accent"] if is_active else COLORS["primary"]
+            body = pygame.Rect(0, 0, rect.width, rect.height)
+
+            field = pygame.Surface((rect.width + 3, rect.height + 3), pygame.SRCALPHA)
+            # Тень
+            pygame.draw.rect(field, (0, 0, 0), body.move(3, 3), border_radius=5)
+            # Поле ввода
+            pygame.draw.rect(field, bg_color, body, border_radius=5)
+            pygame.draw.rect(field, border_color, body, 2, border_radius=5)
+            self.fields[key] = field
+
+        self.screen.blit(field, rect)
         
         # Текст
         display_text = "*" * len(text) if is_password else text
         if display_text:
-            text_surface = self.font_medium.render(display_text, True, COLORS["text"])
-            text_rect = text_surface.get_rect(midleft=(rect.x + 15, rect.centery))
-            self.screen.blit(text_surface, text_rect)
+            text_surface = render_text(display_text, 30, COLORS["text"], bold=True, name=FONT_NAME)
+            text_rect = self.screen.blit(text_surface, text_surface.get_rect(midleft=(rect.x + 15, rect.centery)))
         
         # Подсказка курсора
         if is_active and pygame.time.get_ticks() % 1000 < 500:
@@ -200,37 +259,37 @@ class LoginScreen:
         return rect
 
     def show_message(self, text, color=COLORS["error"], duration=2000):
-        message_rect = pygame.Rect(0, self.height - 80, self.width, 60)
-        pygame.draw.rect(self.screen, (0, 0, 0, 150), message_rect, border_radius=10)
-        
-        text_rect = self.draw_text(
-            text, self.font_small, color, 
-            (self.width // 2, self.height - 50), 
-            "center", True
-        )
-        
-        pygame.display.flip()
-        pygame.time.delay(duration)
-        return text_rect
+        # Сообщение встаёт в очередь и рисуется в обычном цикле кадров
+        self.notifications.push(text, color, duration)
+
+    def wait_for(self, future, text):
+        # Экран продолжает анимироваться, пока задача выполняется в другом потоке
+        while not future.done():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return None
+
+            self.animate_background()
+            self.particles.update()
+            self.particles.draw(self.screen)
+            dots = "." * (pygame.time.get_ticks() // 300 % 4)
+            self.blit_label(self.render_label(text + dots, 24, COLORS["text"]), (self.width // 2, self.height // 2))
+            self.notifications.draw(self.screen)
+            pygame.display.flip()
+            self.notifications.update(self.clock.tick(60))
+        return future.result()
 
     def animate_background(self):
-        self.bg_offset = (self.bg_offset + 0.2) % self.width
-        for i in range(-1, 2):
-            pygame.draw.rect(
-                self.screen, (40, 40, 50),
-                (i * self.width + self.bg_offset, 0, self.width, self.height)
-            )
+        self.ensure_layers()
+        self.screen.blit(self.backdrop, (0, 0))
         
         # Звезды
-        for i in range(20):
-            x = (pygame.time.get_ticks() * 0.1 + i * 100) % self.width
-            y = (i * 50 + pygame.time.get_ticks() * 0.05) % self.height
-            size = 1 + (i % 3)
-            pygame.draw.circle(
-                self.screen, 
-                (100 + i * 5, 100 + i * 5, 150 + i * 5),
-                (int(x), int(y)), size
-            )
+        ticks = pygame.time.get_ticks()
+        self.screen.blits([
+            (star, (int((ticks * 0.1 + i * 100) % self.width) - size,
+                    int((i * 50 + ticks * 0.05) % self.height) - size))
+            for i, (star, size) in enumerate(self.stars)
+        ], False)
 
     def input_credentials(self):
         nickname = ""
@@ -238,31 +297,11 @@ class LoginScreen:
         active_field = None  # "nickname", "password" или None
         error_message = ""
         
-        input_width = min(400, self.width * 0.8)
-        input_height = 50
-        nickname_rect = pygame.Rect(
-            (self.width - input_width) // 2, 
-            self.height // 2 - 80, 
-            input_width, 
-            input_height
-        )
-        password_rect = pygame.Rect(
-            (self.width - input_width) // 2, 
-            self.height // 2, 
-            input_width, 
-            input_height
-        )
-        login_button_rect = pygame.Rect(
-            (self.width - 200) // 2, 
-            self.height // 2 + 80, 
-            200, 
-            50
-        )
-        back_button_rect = pygame.Rect(
-            20, 20, 
-            100, 
-            40
-        )
+        self.ensure_layers()
+        nickname_rect = self.rects["nickname"]
+        password_rect = self.rects["password"]
+        login_button_rect = self.rects["login"]
+        back_button_rect = self.rects["back"]
         
         running = True
         while running:
@@ -302,6 +341,8 @@ class LoginScreen:
                                 nickname += char
                             elif active_field == "password" and len(password) < 20:
                                 password += char
+                            field_rect = nickname_rect if active_field == "nickname" else password_rect
+                            self.particles.add_particles(field_rect.midright, COLORS["accent"], 8)
                 
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1:  # Левая кнопка мыши
@@ -342,42 +383,21 @@ class LoginScreen:
                 self.title_direction *= -1
             
             title_y = self.height // 4 + self.title_offset
-            self.draw_text(
-                "РЕЙТИНГОВЫЙ РЕЖИМ", 
-                self.font_large, 
-                COLORS["accent"], 
-                (self.width // 2, title_y), 
-                "center", 
-                True
-            )
+            self.blit_label(self.title, (self.width // 2, title_y))
             
-            # Поля ввода
-            self.draw_text(
-                "Никнейм:", 
-                self.font_small, 
-                COLORS["text"], 
-                (nickname_rect.x, nickname_rect.y - 30), 
-                "left"
-            )
+            # Поля ввода и подписи над ними
             self.draw_input_field(
                 nickname_rect, 
                 nickname, 
                 active_field == "nickname"
             )
-            
-            self.draw_text(
-                "Пароль:", 
-                self.font_small, 
-                COLORS["text"], 
-                (password_rect.x, password_rect.y - 30), 
-                "left"
-            )
             self.draw_input_field(
                 password_rect, 
                 password, 
                 active_field == "password", 
                 True
             )
+            self.screen.blit(self.chrome, (0, 0))
             
             # Кнопки
             self.draw_button(
@@ -396,12 +416,12 @@ class LoginScreen:
             if error_message:
                 self.show_message(error_message)
                 error_message = ""
+            self.notifications.draw(self.screen)
             
             pygame.display.flip()
-            self.clock.tick(60)
+            self.notifications.update(self.clock.tick(60))
 
 def start_rating_game(screen):
-    auth = AuthSystem()
     login_screen = LoginScreen(screen)
     
     while True:
@@ -415,34 +435,45 @@ def start_rating_game(screen):
         nickname, password = credentials
         
         # Проверка учетных данных
-        users = auth.load_users()
-        hashed_password = auth.hash_password(password)
-        
-        if nickname in users:
-            if users[nickname] != hashed_password:
-                login_screen.show_message("Неверный пароль!", COLORS["error"])
-                continue
-            else:
-                login_screen.show_message(f"С возвращением, {nickname}!", COLORS["success"])
+        users = get_user_directory()
+        future = passwords.authenticate_async(nickname, password, users.get(nickname))
+        outcome = login_screen.wait_for(future, "Проверка пароля")
+        if outcome is None:
+            return  # Выход из игры
+        status, record = outcome
+        if record is not None:
+            # Новый аккаунт или перехэширование старой записи
+            users.set(nickname, record)
+
+        if status == "wrong":
+            login_screen.show_message("Неверный пароль!", COLORS["error"])
+            continue
+        elif status == "ok":
+            login_screen.show_message(f"С возвращением, {nickname}!", COLORS["success"])
         else:
-            users[nickname] = hashed_password
-            auth.save_users(users)
-            login_screen.show_message(f"Новый аккаунт создан!", COLORS["success"])
-            pygame.time.delay(1000)
+            login_screen.show_message(f"Новый аккаунт создан!", COLORS["success"], 1000)
             login_screen.show_message(f"Добро пожаловать, {nickname}!", COLORS["success"])
         
-        # Запуск игры
-        game_result = run_game(screen, mode="rating")
+        # Запуск игры; приветствие досвечивается поверх поля, без паузы перед стартом
+        game_result = run_game(screen, mode="rating", notifications=login_screen.notifications)
         
         # Обработка результатов игры
         if game_result and game_result.get("game_over"):
+            # Запись партии для последующей проверки результата (replay.py)
+            replay_path = None
+            replay = game_result.get("replay")
+            if replay:
+                replay.nickname = nickname
+                replay_path = replay.save(REPLAY_DIR)
+
             RatingSystem.save_highscore(
                 nickname,
                 game_result["score"],
                 game_result["level"],
-                game_result["lines"]
+                game_result["lines"],
+                replay_path
             )
-            
+
             # Показ таблицы рекордов
             if not show_highscores(screen):
                 return  # Выход в меню, если пользователь нажал ESC
@@ -0,0 +1,236 @@
+import os
+import random
+import struct
+import sys
+import time
+from itertools import chain, repeat
+from concurrent.futures import ProcessPoolExecutor
+from engine import Engine
+from randomizer import PieceQueue, make_randomizer
+
+# Компактная запись партии: сид, настройки и поток событий (кадр, игрок, действие).
+# Формат (little-endian):
+#   заголовок  <4sBBBBIH: магия, версия, режим, генератор, число игроков, сид, шаг в мс
+#   ник        varint длина + UTF-8
+#   результат  varint очки, уровень, линии (то, что заявил клиент)
+#   кадры      varint число кадров; при шаге 0 - RLE пар (varint повтор, varint dt)
+#   события    varint число; каждое - varint разница кадров и байт (игрок << 4 | действие)
+MAGIC = b"TRPL"
+VERSION = 2  # 2: мягкий сброс - один ряд вниз вместо пропуска 100 мс
+HEADER = struct.Struct("<4sBBBBIH")
+MODE_CODES = ("normal", "rating")
+RANDOMIZER_CODES = ("uniform", "bag", "history")
+REPLAY_EXTENSION = ".trp"
+
+# Рестарт не является действием движка - он кодируется отдельно
+RESTART = 15
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    def __init__(self, seed, mode="normal", randomizer="uniform", players=1, step_ms=0):
+        self.seed = seed
+        self.mode = mode
+        self.randomizer = randomizer
+        self.players = players
+        self.step_ms = step_ms
+        self.nickname = ""
+        self.result = {"score": 0, "level": 1, "lines": 0}
+        self.frame_times = []  # dt каждого кадра, если шаг переменный
+        self.frame_count = 0
+        self.events = []  # (кадр, игрок, действие)
+
+    # Запись из игрового цикла: события относятся к ближайшему следующему шагу
+    def record(self, player, action):
+        self.events.append((self.frame_count, player, action))
+
+    def step(self, dt=None):
+        if not self.step_ms:
+            self.frame_times.append(dt)
+        self.frame_count += 1
+
+    def finish(self, result):
+        self.result = {key: result[key] for key in ("score", "level", "lines")}
+        return self
+
+    def steps(self):
+        if self.step_ms:
+            return repeat(self.step_ms, self.frame_count)
+        return self.frame_times
+
+    def queue_seeds(self):
+        # Сид очереди фигур для первой партии и для каждого рестарта
+        return random.Random(self.seed)
+
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, MODE_CODES.index(self.mode),
+                                    RANDOMIZER_CODES.index(self.randomizer), self.players,
+                                    self.seed, self.step_ms))
+        nickname = self.nickname.encode("utf-8")
+        write_varint(out, len(nickname))
+        out += nickname
+        for key in ("score", "level", "lines"):
+            write_varint(out, self.result[key])
+
+        write_varint(out, self.frame_count)
+        if not self.step_ms:
+            runs = []
+            for dt in self.frame_times:
+                if runs and runs[-1][1] == dt:
+                    runs[-1][0] += 1
+                else:
+                    runs.append([1, dt])
+            write_varint(out, len(runs))
+            for count, dt in runs:
+                write_varint(out, count)
+                write_varint(out, dt)
+
+        write_varint(out, len(self.events))
+        last_frame = 0
+        for frame, player, action in self.events:
+            write_varint(out, frame - last_frame)
+            out.append(player << 4 | action)
+            last_frame = frame
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, mode, randomizer, players, seed, step_ms = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Неизвестный формат записи")
+        replay = cls(seed, MODE_CODES[mode], RANDOMIZER_CODES[randomizer], players, step_ms)
+        pos = HEADER.size
+        length, pos = read_varint(data, pos)
+        replay.nickname = data[pos:pos + length].decode("utf-8")
+        pos += length
+        for key in ("score", "level", "lines"):
+            replay.result[key], pos = read_varint(data, pos)
+
+        replay.frame_count, pos = read_varint(data, pos)
+        if not step_ms:
+            runs, pos = read_varint(data, pos)
+            for _ in range(runs):
+                count, pos = read_varint(data, pos)
+                dt, pos = read_varint(data, pos)
+                replay.frame_times.extend([dt] * count)
+
+        count, pos = read_varint(data, pos)
+        frame = 0
+        for _ in range(count):
+            delta, pos = read_varint(data, pos)
+            frame += delta
+            replay.events.append((frame, data[pos] >> 4, data[pos] & 0x0F))
+            pos += 1
+        return replay
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        name = f"{int(time.time() * 1000)}_{self.seed:08x}{REPLAY_EXTENSION}"
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+        return path
+
+
+def simulate(replay):
+    # Прогон записи через правила без отрисовки - повторяет логику run_game
+    seeds = replay.queue_seeds()
+    queue = PieceQueue(make_randomizer(replay.randomizer, seeds.getrandbits(32)))
+    games = [Engine(randomizer=queue.cursor(), mode=replay.mode) for _ in range(replay.players)]
+    multiplayer = replay.players > 1
+    winner_declared = False
+    events = replay.events
+    index = 0
+
+    # Последний None - события после последнего шага (например, финальный сброс фигуры)
+    for frame, dt in enumerate(chain(replay.steps(), [None])):
+        while index < len(events) and events[index][0] == frame:
+            _, player, action = events[index]
+            index += 1
+            if action == RESTART:
+                queue = PieceQueue(make_randomizer(replay.randomizer, seeds.getrandbits(32)))
+                for game in games:
+                    game.restart(queue.cursor())
+                winner_declared = False
+            elif not games[player].game_over and not winner_declared:
+                games[player].apply(action)
+
+        if dt is None:
+            break
+        if not winner_declared:
+            for game in games:
+                if not game.game_over:
+                    game.update(dt)
+            if multiplayer and any(game.game_over for game in games):
+                winner_declared = True
+
+    return {
+        "score": max(game.score for game in games),
+        "level": max(game.level for game in games),
+        "lines": max(game.lines_cleared_total for game in games),
+    }
+
+
+def verify(data):
+    replay = Replay.from_bytes(data)
+    actual = simulate(replay)
+    return {
+        "nickname": replay.nickname,
+        "claimed": replay.result,
+        "actual": actual,
+        "ok": actual == replay.result,
+    }
+
+
+def verify_file(path):
+    # Битая запись попадает в отчёт как не прошедшая проверку и не
+    # прерывает проверку остальных
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        report = verify(data)
+    except (ValueError, struct.error, IndexError, UnicodeDecodeError) as e:
+        report = {"ok": False, "error": str(e)}
+    report["path"] = path
+    return report
+
+
+def verify_directory(directory, workers=None):
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                   if name.endswith(REPLAY_EXTENSION))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(verify_file, paths, chunksize=16))
+
+
+if __name__ == "__main__":
+    # python replay.py <папка с записями> [число процессов]
+    directory = sys.argv[1] if len(sys.argv) > 1 else "assets/replays"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    start = time.perf_counter()
+    reports = verify_directory(directory, workers)
+    failed = [report for report in reports if not report["ok"]]
+    for report in failed:
+        if "error" in report:
+            print(f"ОШИБКА {report['path']}: {report['error']}")
+            continue
+        print(f"НЕ СОВПАДАЕТ {report['path']} ({report['nickname']}): "
+              f"заявлено {report['claimed']}, по записи {report['actual']}")
+    print(f"Проверено {len(reports)} записей за {time.perf_counter() - start:.2f} с, "
+          f"расхождений: {len(failed)}")
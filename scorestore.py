@@ -0,0 +1,97 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Хранилище рекордов во встроенной SQLite: запись результата - одна вставка
+# в транзакции (O(log n) по индексам), вся история сохраняется, а топ и
+# результаты игрока читаются по индексам без сортировки всей таблицы.
+HIGHSCORES_DB = "assets/highscores.db"
+LEGACY_HIGHSCORES_FILE = "assets/highscores.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS highscores (
+    id INTEGER PRIMARY KEY,
+    nickname TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    date INTEGER NOT NULL,
+    replay TEXT
+);
+CREATE INDEX IF NOT EXISTS highscores_by_score ON highscores (score DESC, id);
+CREATE INDEX IF NOT EXISTS highscores_by_nickname ON highscores (nickname, score DESC);
+"""
+
+COLUMNS = ("nickname", "score", "level", "lines", "date", "replay")
+
+
+class HighscoreStore:
+    def __init__(self, path=HIGHSCORES_DB, legacy_file=LEGACY_HIGHSCORES_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Хранилище открывается фоновой загрузкой (assets.py), а используется из игры
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        if legacy_file and self.count() == 0:
+            self.import_json(legacy_file)
+
+    def import_json(self, path):
+        # Перенос старого highscores.json при первом запуске
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r") as f:
+                entries = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return 0
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO highscores (nickname, score, level, lines, date) VALUES (?, ?, ?, ?, ?)",
+                [(e["nickname"], e["score"], e["level"], e["lines"], e["date"]) for e in entries])
+        return len(entries)
+
+    def add(self, nickname, score, level, lines, date=None, replay=None):
+        if date is None:
+            date = int(time.time() * 1000)
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO highscores (nickname, score, level, lines, date, replay) VALUES (?, ?, ?, ?, ?, ?)",
+                (nickname, score, level, lines, date, replay))
+        return cursor.lastrowid
+
+    def top(self, limit=100, offset=0):
+        rows = self.conn.execute(
+            "SELECT nickname, score, level, lines, date, replay FROM highscores "
+            "ORDER BY score DESC, id LIMIT ? OFFSET ?", (limit, offset))
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def best_for(self, nickname, limit=10):
+        rows = self.conn.execute(
+            "SELECT nickname, score, level, lines, date, replay FROM highscores "
+            "WHERE nickname = ? ORDER BY score DESC LIMIT ?", (nickname, limit))
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def rank(self, score):
+        # Место результата в общем рейтинге
+        return self.conn.execute("SELECT COUNT(*) FROM highscores WHERE score > ?", (score,)).fetchone()[0] + 1
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM highscores").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HighscoreStore()
+        return _store
@@ -1,10 +1,11 @@
 import pygame
-import json
-import os
+import config
+from collections import OrderedDict
 from datetime import datetime
+from fonts import render_text
+from scorestore import get_store
 
 # Константы
-HIGHSCORES_FILE = "assets/highscores.json"
 FONT_NAME = "Arial"
 GRAY = (30, 30, 30)
 WHITE = (255, 255, 255)
@@ -15,17 +16,26 @@ DARK_BLUE = (0, 50, 150)
 LIGHT_GRAY = (60, 60, 60)
 HIGHLIGHT_COLOR = (255, 255, 150)
 
-# Градиент для фона
+# Градиент для фона: рисуется один раз на каждое разрешение
+_gradient_cache = {}
+
+def gradient_background(size):
+    surface = _gradient_cache.get(size)
+    if surface is None:
+        width, height = size
+        surface = pygame.Surface(size)
+        # Интерполяция между темно-серым и почти черным: цвет меняется полосами по 30 строк
+        for y in range(0, height, 30):
+            shade = max(10, 30 - y // 30)
+            surface.fill((shade, shade, shade), (0, y, width, 30))
+        _gradient_cache[size] = surface
+    return surface
+
 def draw_gradient_background(screen):
-    width, height = screen.get_size()
-    for y in range(height):
-        # Интерполяция между темно-серым и почти черным
-        color = [max(10, 30 - y//30), max(10, 30 - y//30), max(10, 30 - y//30)]
-        pygame.draw.line(screen, color, (0, y), (width, y))
+    screen.blit(gradient_background(screen.get_size()), (0, 0))
 
 def draw_text(screen, text, size, x, y, color=WHITE, align="center", font_name=FONT_NAME, bold=True):
-    font = pygame.font.SysFont(font_name, size, bold=bold)
-    label = font.render(text, True, color)
+    label = render_text(text, size, color, bold=bold, name=font_name)
     if align == "center":
         rect = label.get_rect(center=(x, y))
     elif align == "left":
@@ -44,23 +54,136 @@ def draw_button(screen, text, rect, color, hover=False, text_color=BLACK):
     # Текст кнопки
     draw_text(screen, text, 30, rect.centerx, rect.centery, text_color)
 
-def load_highscores():
-    if not os.path.exists(HIGHSCORES_FILE):
-        return []
-    try:
-        with open(HIGHSCORES_FILE, "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return []
+# Строк в одной странице, читаемой из хранилища
+PAGE_ROWS = 100
+
+class HighscoreTable:
+    # Таблица рекордов: каждая строка форматируется и рисуется в поверхность один раз,
+    # сразу в двух вариантах (обычном и подсвеченном). При прокрутке копируются только
+    # видимые строки, а кэш строк ограничен, так что размер таблицы не важен.
+    # Записи читаются из хранилища страницами (store.top(limit, offset)) по мере
+    # прокрутки; в памяти держится не больше cache_pages страниц.
+    def __init__(self, store, total, x, y, width, row_height, col_widths, headers, header_size, font_size,
+                 cache_rows=512, cache_pages=16):
+        self.store = store
+        self.total = total
+        self.x = x
+        self.y = y
+        self.width = width
+        self.row_height = row_height
+        self.col_widths = col_widths
+        self.headers = headers
+        self.header_size = header_size
+        self.font_size = font_size
+        self.cache_rows = cache_rows
+        self.cache_pages = cache_pages
+        self._rows = OrderedDict()
+        self._pages = OrderedDict()
+        self._header = [self.render_header(False), self.render_header(True)]
+
+    def render_header(self, hovered):
+        cells = []
+        for i, header in enumerate(self.headers):
+            cell = pygame.Surface((self.col_widths[i], self.row_height))
+            cell.fill(DARK_BLUE if hovered else BLUE)
+            label = render_text(header, self.header_size, WHITE, bold=True)
+            cell.blit(label, label.get_rect(center=(self.col_widths[i] // 2, self.row_height // 2)))
+            cells.append(cell)
+        return cells
+
+    def entry(self, i):
+        page, index = divmod(i, PAGE_ROWS)
+        entries = self._pages.get(page)
+        if entries is None:
+            entries = self.store.top(PAGE_ROWS, page * PAGE_ROWS)
+            self._pages[page] = entries
+            if len(self._pages) > self.cache_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page)
+        # Записи могли удалить после подсчёта - такой строки просто нет
+        return entries[index] if index < len(entries) else None
+
+    def format_row(self, i, entry):
+        date = datetime.fromtimestamp(entry["date"] / 1000).strftime("%d.%m.%Y %H:%M")
+        return [
+            str(i + 1),
+            entry["nickname"][:15],  # Ограничение длины ника
+            f"{entry['score']:,}".replace(",", " "),
+            str(entry["level"]),
+            str(entry["lines"]),
+            date
+        ]
+
+    def render_row(self, row_data, i, highlighted):
+        surface = pygame.Surface((self.width, self.row_height))
+        if highlighted:
+            surface.fill(HIGHLIGHT_COLOR)
+            text_color = BLACK
+        else:
+            # Чередование цвета строк
+            surface.fill(LIGHT_GRAY if i % 2 == 0 else (50, 50, 50))
+            text_color = WHITE
+
+        x = 0
+        for j, data in enumerate(row_data):
+            pygame.draw.rect(surface, (40, 40, 40), (x, 0, self.col_widths[j], self.row_height), 1)  # Разделители
+            label = render_text(data, self.font_size, text_color, bold=(j == 2))  # Жирный шрифт для очков
+            surface.blit(label, label.get_rect(center=(x + self.col_widths[j] // 2, self.row_height // 2)))
+            x += self.col_widths[j]
+        return surface
+
+    def row_surfaces(self, i):
+        surfaces = self._rows.get(i)
+        if surfaces is None:
+            entry = self.entry(i)
+            if entry is None:
+                return None
+            row_data = self.format_row(i, entry)
+            surfaces = (self.render_row(row_data, i, False), self.render_row(row_data, i, True))
+            self._rows[i] = surfaces
+            if len(self._rows) > self.cache_rows:
+                self._rows.popitem(last=False)
+        else:
+            self._rows.move_to_end(i)
+        return surfaces
+
+    def draw(self, screen, scroll_offset, mouse_pos, bottom):
+        # Заголовки таблицы
+        header_y = self.y - scroll_offset
+        x = self.x
+        for i in range(len(self.headers)):
+            header_rect = pygame.Rect(x, header_y, self.col_widths[i], self.row_height)
+            screen.blit(self._header[header_rect.collidepoint(mouse_pos)][i], header_rect)
+            x += self.col_widths[i]
+
+        # Видимый диапазон строк считается напрямую из смещения прокрутки
+        first = max(0, int(scroll_offset // self.row_height) - 2)
+        last = min(self.total, int((bottom - self.y + scroll_offset) // self.row_height))
+        for i in range(first, last):
+            y_pos = self.y + (i + 1) * self.row_height - scroll_offset
+            # Пропускаем строки, которые не видны
+            if y_pos + self.row_height < self.y or y_pos > bottom:
+                continue
+            surfaces = self.row_surfaces(i)
+            if surfaces is None:
+                break
+            row_rect = pygame.Rect(self.x, y_pos, self.width, self.row_height)
+            screen.blit(surfaces[row_rect.collidepoint(mouse_pos)], row_rect)
+
+
+def load_highscores(limit=None):
+    # Лучшие результаты уже отсортированы индексом хранилища. Таблица
+    # рекордов этим не пользуется - она читает страницы сама
+    return get_store().top(limit or config.HIGHSCORE_TABLE_LIMIT)
 
 def show_highscores(screen):
     clock = pygame.time.Clock()
     width, height = screen.get_size()
     
-    # Загрузка и сортировка рекордов
-    highscores = load_highscores()
-    highscores.sort(key=lambda x: x["score"], reverse=True)
-    highscores = highscores[:100]
+    # Загружается только число записей, сами записи - по мере прокрутки
+    store = get_store()
+    total = store.count()
     
     # Адаптивные размеры
     table_width = min(width * 0.9, 1000)  # Максимальная ширина таблицы
@@ -85,18 +208,22 @@ def show_highscores(screen):
     button_height = min(50, height * 0.08)
     back_button_rect = pygame.Rect((width - button_width) // 2, height - 100, button_width, button_height)
     
+    table = HighscoreTable(store, total, table_x, table_y, table_width, row_height, col_widths,
+                           headers, min(28, width // 40), min(24, width // 50))
+
     # Прокрутка
     scroll_offset = 0
-    max_scroll = max(0, len(highscores) * row_height - height * 0.5)
+    max_scroll = max(0, total * row_height - height * 0.5)
     
     # Анимация появления
+    background = gradient_background((width, height))
     alpha_surface = pygame.Surface((width, height))
     alpha_surface.fill(BLACK)
     for alpha in range(255, 0, -10):
         alpha_surface.set_alpha(alpha)
-        draw_gradient_background(screen)
-        pygame.display.flip()
+        screen.blit(background, (0, 0))
         screen.blit(alpha_surface, (0, 0))
+        pygame.display.flip()
         pygame.time.delay(30)
     
     running = True
@@ -128,7 +255,7 @@ def show_highscores(screen):
                     scroll_offset = min(max(0, scroll_offset - event.rel[1]), max_scroll)
         
         # Отрисовка
-        draw_gradient_background(screen)
+        screen.blit(background, (0, 0))
         
         # Заголовок с эффектом свечения
         draw_text(screen, "Таблица рекордов", min(60, width // 15), width // 2, table_y * 0.7, YELLOW)
@@ -136,70 +263,17 @@ def show_highscores(screen):
         
         # Область таблицы с тенью
         table_rect = pygame.Rect(table_x - 10, table_y - 10, table_width + 20, 
-                                min(height * 0.6, (len(highscores) + 2) * row_height) + 20)
+                                min(height * 0.6, (total + 2) * row_height) + 20)
         pygame.draw.rect(screen, (20, 20, 20), table_rect, border_radius=15)
         pygame.draw.rect(screen, (80, 80, 80), table_rect, 2, border_radius=15)
         
-        # Заголовки таблицы
-        x = table_x
-        for i, header in enumerate(headers):
-            header_rect = pygame.Rect(x, table_y - scroll_offset, col_widths[i], row_height)
-            if header_rect.collidepoint(mouse_pos):
-                pygame.draw.rect(screen, DARK_BLUE, header_rect)
-            else:
-                pygame.draw.rect(screen, BLUE, header_rect)
-            
-            draw_text(screen, header, min(28, width // 40), 
-                     x + col_widths[i] // 2, table_y + row_height // 2 - scroll_offset, 
-                     WHITE, align="center", bold=True)
-            x += col_widths[i]
-        
-        # Строки таблицы
-        visible_rows = range(len(highscores))  # Все строки, прокрутка обрабатывается через offset
-        for i in visible_rows:
-            y_pos = table_y + (i + 1) * row_height - scroll_offset
-            
-            # Пропускаем строки, которые не видны
-            if y_pos + row_height < table_y or y_pos > height - 100:
-                continue
-            
-            entry = highscores[i]
-            date = datetime.fromtimestamp(entry["date"] / 1000).strftime("%d.%m.%Y %H:%M")
-            row_data = [
-                str(i + 1),
-                entry["nickname"][:15],  # Ограничение длины ника
-                f"{entry['score']:,}".replace(",", " "),
-                str(entry["level"]),
-                str(entry["lines"]),
-                date
-            ]
-            
-            # Подсветка строки при наведении
-            row_rect = pygame.Rect(table_x, y_pos, table_width, row_height)
-            if row_rect.collidepoint(mouse_pos):
-                pygame.draw.rect(screen, HIGHLIGHT_COLOR, row_rect)
-                text_color = BLACK
-            else:
-                # Чередование цвета строк
-                bg_color = LIGHT_GRAY if i % 2 == 0 else (50, 50, 50)
-                pygame.draw.rect(screen, bg_color, row_rect)
-                text_color = WHITE
-            
-            # Отрисовка данных строки
-            x = table_x
-            for j, data in enumerate(row_data):
-                cell_rect = pygame.Rect(x, y_pos, col_widths[j], row_height)
-                pygame.draw.rect(screen, (40, 40, 40), cell_rect, 1)  # Разделители
-                
-                draw_text(screen, data, min(24, width // 50), 
-                         x + col_widths[j] // 2, y_pos + row_height // 2, 
-                         text_color, align="center", bold=(j == 2))  # Жирный шрифт для очков
-                x += col_widths[j]
-        
+        # Заголовки и видимые строки таблицы
+        table.draw(screen, scroll_offset, mouse_pos, height - 100)
+
         # Полоса прокрутки
         if max_scroll > 0:
             scroll_ratio = scroll_offset / max_scroll
-            scrollbar_height = height * 0.5 * (height * 0.5 / (len(highscores) * row_height))
+            scrollbar_height = height * 0.5 * (height * 0.5 / (total * row_height))
             scrollbar_height = max(scrollbar_height, 40)
             scrollbar_y = table_y + (height * 0.5 - scrollbar_height) * scroll_ratio
             
@@ -213,7 +287,7 @@ def show_highscores(screen):
                   back_button_rect.collidepoint(mouse_pos))
         
         # Информация о количестве записей
-        draw_text(screen, f"Всего записей: {len(highscores)}", min(24, width // 50), 
+        draw_text(screen, f"Всего записей: {total}", min(24, width // 50), 
                  width // 2, height - 50, (200, 200, 200))
         
         pygame.display.flip()
@@ -222,9 +296,9 @@ def show_highscores(screen):
     # Анимация исчезновения
     for alpha in range(0, 255, 15):
         alpha_surface.set_alpha(alpha)
-        draw_gradient_background(screen)
-        pygame.display.flip()
+        screen.blit(background, (0, 0))
         screen.blit(alpha_surface, (0, 0))
+        pygame.display.flip()
         pygame.time.delay(30)
     
     return False
\ No newline at end of file
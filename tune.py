@@ -0,0 +1,177 @@
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from ai import DEFAULT_WEIGHTS, TUNING_FILE, Planner, autoplay
+
+# Подбор весов оценки ai.py генетическим алгоритмом. Каждая особь - вектор
+# весов единичной длины; её приспособленность - среднее число линий за
+# партии с общими для поколения сидами. Партии идут без отрисовки во всех
+# ядрах, популяция сохраняется после каждого поколения и при повторном
+# запуске обучение продолжается с сохранённого места.
+#
+# Сиды каждого поколения новые, поэтому оценки разных поколений несравнимы.
+# Лучшие особи поколения перепроверяются на постоянных проверочных сидах, и
+# только эта оценка решает, заменят ли они сохранённые лучшие веса. Отсчёт
+# идёт от весов по умолчанию: хуже них в файл ничего не попадёт. Эти веса
+# компьютерный игрок берёт через ai.load_weights().
+CHECKPOINT_FILE = TUNING_FILE
+FEATURES = tuple(DEFAULT_WEIGHTS)
+PIECES = 500  # фигур в партии: без ограничения хорошие веса играют бесконечно
+LOOKAHEAD = 0
+ELITE = 0.2  # доля лучших, переходящих в следующее поколение без изменений
+MUTATION_RATE = 0.2
+MUTATION_SCALE = 0.2
+VALIDATION_GAMES = 16  # партий на проверочных сидах
+VALIDATION_CANDIDATES = 3  # сколько лучших особей поколения перепроверяется
+
+
+def normalize(vector):
+    length = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / length for v in vector]
+
+
+def random_individual(rng):
+    return normalize([rng.uniform(-1, 1) for _ in FEATURES])
+
+
+def play(task):
+    # Одна партия в процессе пула: (номер особи, число линий)
+    index, vector, seed = task
+    planner = Planner(dict(zip(FEATURES, vector)), LOOKAHEAD, budget_ms=None)
+    return index, autoplay(seed, PIECES, planner)["lines"]
+
+
+def evaluate(pool, vectors, seeds):
+    # Среднее число линий каждого вектора на одних и тех же сидах
+    tasks = [(i, vector, s) for i, vector in enumerate(vectors) for s in seeds]
+    lines = [[] for _ in vectors]
+    for index, result in pool.map(play, tasks):
+        lines[index].append(result)
+    return lines
+
+
+def crossover(rng, a, b, fitness_a, fitness_b):
+    # Среднее родителей, взвешенное их приспособленностью
+    total = fitness_a + fitness_b
+    share = fitness_a / total if total else 0.5
+    return normalize([share * x + (1 - share) * y for x, y in zip(a, b)])
+
+
+def mutate(rng, vector):
+    if rng.random() < MUTATION_RATE:
+        i = rng.randrange(len(vector))
+        vector = list(vector)
+        vector[i] += rng.uniform(-MUTATION_SCALE, MUTATION_SCALE)
+    return normalize(vector)
+
+
+def next_generation(rng, population, fitness):
+    ranked = sorted(range(len(population)), key=lambda i: fitness[i], reverse=True)
+    elite = max(1, int(len(population) * ELITE))
+    children = [population[i] for i in ranked[:elite]]
+
+    def tournament():
+        contenders = rng.sample(range(len(population)), min(4, len(population)))
+        return max(contenders, key=lambda i: fitness[i])
+
+    while len(children) < len(population):
+        a, b = tournament(), tournament()
+        children.append(mutate(rng, crossover(rng, population[a], population[b], fitness[a], fitness[b])))
+    return children
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, state):
+    # Временный файл и атомарная подмена, как в userstore.py
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def distribution(values):
+    values = sorted(values)
+    quartiles = statistics.quantiles(values, n=4) if len(values) > 1 else values * 3
+    return (f"мин {values[0]}, q1 {quartiles[0]:.0f}, медиана {quartiles[1]:.0f}, "
+            f"q3 {quartiles[2]:.0f}, макс {values[-1]}")
+
+
+def tune(generations=10, population_size=32, games=8, workers=None, path=CHECKPOINT_FILE, seed=0):
+    state = load_checkpoint(path)
+    if state is None:
+        rng = random.Random(seed)
+        state = {
+            "generation": 0,
+            "population": [random_individual(rng) for _ in range(population_size)],
+            "best": None,
+            "history": [],
+        }
+    if "validation_seeds" not in state:
+        # Прежний "best" без проверки ни с чем не сравним - отбор начинается заново
+        validation_rng = random.Random(f"{seed}:validation")
+        state["validation_seeds"] = [validation_rng.getrandbits(32) for _ in range(VALIDATION_GAMES)]
+        state["best"] = None
+    validation_seeds = state["validation_seeds"]
+    rng = random.Random(f"{seed}:{state['generation']}")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if state["best"] is None:
+            defaults = [DEFAULT_WEIGHTS[feature] for feature in FEATURES]
+            results, = evaluate(pool, [defaults], validation_seeds)
+            state["best"] = {"fitness": sum(results) / len(results), "weights": dict(DEFAULT_WEIGHTS)}
+            print(f"веса по умолчанию: {state['best']['fitness']:.1f} линий на проверочных сидах")
+            save_checkpoint(path, state)
+
+        for _ in range(generations):
+            population = state["population"]
+            # Одни сиды на всё поколение - особи сравниваются на одинаковых партиях
+            seeds = [rng.getrandbits(32) for _ in range(games)]
+
+            start = time.perf_counter()
+            lines = evaluate(pool, population, seeds)
+            elapsed = time.perf_counter() - start
+
+            fitness = [sum(results) / len(results) for results in lines]
+            ranked = sorted(range(len(population)), key=lambda i: fitness[i], reverse=True)
+            candidates = ranked[:VALIDATION_CANDIDATES]
+            validation = [sum(results) / len(results)
+                          for results in evaluate(pool, [population[i] for i in candidates], validation_seeds)]
+            checked = max(range(len(candidates)), key=lambda i: validation[i])
+            if validation[checked] > state["best"]["fitness"]:
+                state["best"] = {"fitness": validation[checked],
+                                 "weights": dict(zip(FEATURES, population[candidates[checked]]))}
+
+            best = ranked[0]
+            state["generation"] += 1
+            state["history"].append({"best": fitness[best], "mean": statistics.mean(fitness),
+                                     "validation": validation[checked]})
+            print(f"поколение {state['generation']}: {len(population) * games / elapsed:,.1f} партий/с, "
+                  f"лучшая {fitness[best]:.1f} линий, средняя {statistics.mean(fitness):.1f}, "
+                  f"на проверке {validation[checked]:.1f}; "
+                  f"партии: {distribution([value for results in lines for value in results])}")
+
+            state["population"] = next_generation(rng, population, fitness)
+            save_checkpoint(path, state)
+
+    print(f"Лучшие веса ({state['best']['fitness']:.1f} линий на проверке): {state['best']['weights']}")
+    return state["best"]
+
+if __name__ == "__main__":
+    # python tune.py [поколений] [размер популяции] [партий на особь] [процессов]
+    generations = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    population_size = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    games = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    tune(generations, population_size, games, workers)
@@ -0,0 +1,124 @@
+import atexit
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Каталог пользователей в памяти. Снимок users.json читается один раз,
+# каждое изменение дописывается строкой в журнал (без перезаписи файла),
+# а снимок время от времени пересобирается во временный файл и атомарно
+# подменяется через os.replace. Пересборка начинается, когда журнал
+# дорастает до половины снимка, поэтому её цена на одну запись постоянна.
+# Запись в журнал и пересборка идут в отдельном потоке: set() только
+# меняет словарь и ставит запись в очередь.
+USER_DB_FILE = "assets/users.json"
+COMPACT_EVERY = 1000  # наименьшее число записей журнала до пересборки снимка
+
+
+class UserDirectory:
+    def __init__(self, path=USER_DB_FILE, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_every = compact_every
+        self.users = self.load_snapshot()
+        self.journal_entries = self.replay_journal()
+        self.journal = None
+        # Словарь меняет вызывающий поток, а снимок читает поток записи
+        self.lock = threading.Lock()
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="userstore")
+
+    def load_snapshot(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Ошибка загрузки {self.path}: {e}")
+            return {}
+
+    def replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return 0
+        count = 0
+        good = 0  # смещение конца последней целой строки
+        with open(self.journal_path, "r+b") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("строка без конца")
+                    nickname, record = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    # Недописанная строка после сбоя - всё до неё уже применено.
+                    # Хвост отрезается, иначе следующая запись допишется к нему
+                    print(f"Журнал {self.journal_path} обрезан до {good} байт")
+                    f.truncate(good)
+                    break
+                self.users[nickname] = record
+                good += len(line)
+                count += 1
+        return count
+
+    def get(self, nickname):
+        return self.users.get(nickname)
+
+    def __contains__(self, nickname):
+        return nickname in self.users
+
+    def __len__(self):
+        return len(self.users)
+
+    def set(self, nickname, record):
+        # Возвращает future записи - её можно дождаться, если нужно
+        with self.lock:
+            self.users[nickname] = record
+        return self.writer.submit(self.write, nickname, record)
+
+    def write(self, nickname, record):
+        # Выполняется в потоке записи, по одной записи по порядку
+        if self.journal is None:
+            os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+            self.journal = open(self.journal_path, "a", encoding="utf-8")
+        self.journal.write(json.dumps([nickname, record], ensure_ascii=False) + "\n")
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.journal_entries += 1
+        if self.journal_entries >= max(self.compact_every, len(self.users) // 2):
+            self.compact()
+
+    def compact(self):
+        with self.lock:
+            users = dict(self.users)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(users, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # Снимок уже содержит всё из журнала - журнал можно начать заново
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.journal_entries = 0
+
+    def close(self):
+        # Дописывает очередь и сводит журнал в снимок; после close() set() недоступен
+        self.writer.shutdown(wait=True)
+        if self.journal_entries:
+            self.compact()
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_user_directory():
+    global _directory
+    with _directory_lock:
+        if _directory is None:
+            _directory = UserDirectory()
+            atexit.register(_directory.close)
+        return _directory
@@ -0,0 +1,112 @@
+import random
+
+# Хэширование позиций по Зобристу: у каждой клетки (x, y) свой случайный
+# 64-битный ключ, хэш поля - XOR ключей занятых клеток. Для скорости ключи
+# сведены в таблицы по строкам: для строки y и каждого байта её клеток
+# таблица сразу даёт XOR ключей всех установленных битов. Поэтому изменение
+# строки пересчитывается за пару обращений к таблице, а не по клеткам.
+SEED = 0x2B0B
+CHUNK = 8  # клеток на одну таблицу строки
+
+
+def splitmix64(value):
+    # Детерминированное перемешивание числа в 64-битный ключ
+    value = (value + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return value ^ (value >> 31)
+
+
+class ZobristKeys:
+    def __init__(self, columns, rows, seed=SEED):
+        rng = random.Random(f"{seed}:{columns}x{rows}")
+        self.cells = [[rng.getrandbits(64) for _ in range(columns)] for _ in range(rows)]
+        self.tables = []
+        for y in range(rows):
+            row_tables = []
+            for start in range(0, columns, CHUNK):
+                keys = self.cells[y][start:start + CHUNK]
+                table = [0] * (1 << len(keys))
+                for bits in range(1, len(table)):
+                    low = bits & -bits
+                    table[bits] = table[bits ^ low] ^ keys[low.bit_length() - 1]
+                row_tables.append(table)
+            self.tables.append(row_tables)
+
+    def row(self, y, cells):
+        # XOR ключей клеток строки y; cells - биты занятых столбцов
+        value = 0
+        for table in self.tables[y]:
+            value ^= table[cells & 0xFF]
+            cells >>= CHUNK
+        return value
+
+
+_keys = {}
+
+
+def get_keys(columns, rows):
+    keys = _keys.get((columns, rows))
+    if keys is None:
+        keys = _keys[(columns, rows)] = ZobristKeys(columns, rows)
+    return keys
+
+
+def piece_key(kind, rotation, x, y):
+    # Ключ активной фигуры; координаты сдвинуты, чтобы отрицательные не совпадали
+    return splitmix64((((ord(kind) * 4 + rotation) * 256 + x + 128) * 256 + y + 128))
+
+
+def kind_key(kind):
+    # Ключ вида фигуры - например, следующей в очереди при поиске с просмотром
+    return splitmix64(ord(kind) | 1 << 40)
+
+
+class TranspositionTable:
+    # Таблица позиций фиксированного размера (степень двойки): ячейка
+    # выбирается младшими битами хэша, полный ключ хранится для проверки.
+    # Замещение: пустая ячейка, тот же ключ, запись из прошлого поиска
+    # или запись не глубже новой; иначе новая запись отбрасывается.
+    def __init__(self, size_bits=18):
+        self.mask = (1 << size_bits) - 1
+        self.keys = [None] * (self.mask + 1)
+        self.values = [None] * (self.mask + 1)
+        self.depths = [0] * (self.mask + 1)
+        self.ages = [0] * (self.mask + 1)
+        self.age = 0
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "replacements": 0, "rejected": 0}
+
+    def new_search(self):
+        # Записи прошлых поисков остаются доступны, но уступают место новым
+        self.age += 1
+
+    def get(self, key, depth=0):
+        slot = key & self.mask
+        if self.keys[slot] == key and self.depths[slot] >= depth:
+            self.stats["hits"] += 1
+            return self.values[slot]
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key, value, depth=0):
+        slot = key & self.mask
+        stored = self.keys[slot]
+        if stored is not None and stored != key:
+            if self.ages[slot] == self.age and self.depths[slot] > depth:
+                self.stats["rejected"] += 1
+                return
+            self.stats["replacements"] += 1
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.depths[slot] = depth
+        self.ages[slot] = self.age
+        self.stats["stores"] += 1
+
+    def __len__(self):
+        return sum(key is not None for key in self.keys)
+
+    def clear(self):
+        self.keys = [None] * (self.mask + 1)
+        self.values = [None] * (self.mask + 1)
+        self.depths = [0] * (self.mask + 1)
+        self.ages = [0] * (self.mask + 1)